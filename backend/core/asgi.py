@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from files.events import EVENTS_PATH, sse_app  # noqa: E402  (needs the app registry)
+from files.middleware import admission_asgi  # noqa: E402
+
+# Uploads are admitted or shed from their headers, before Django buffers the body
+django_application = admission_asgi(django_application)
+
+
+async def application(scope, receive, send):
+    """Route the SSE stream to its own ASGI app and everything else to Django"""
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await sse_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
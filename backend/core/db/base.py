@@ -0,0 +1,92 @@
+"""
+SQLite backend with the connection options Django 5.1 added to the stock one:
+
+- `init_command`: `;`-separated statements (PRAGMAs) run on every new connection
+- `transaction_mode`: `DEFERRED`, `IMMEDIATE` or `EXCLUSIVE` for `atomic()` blocks
+
+plus `pool_size`: how many idle connections each process keeps for reuse.
+Use it as `"ENGINE": "core.db"`.
+"""
+import os
+import queue
+import threading
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+# Idle connections per (process, database file); never shared across a fork
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pool(name=None):
+    """Close this process's idle pooled connections, for every database file or only `name`"""
+    with _pools_lock:
+        pools = [pool for (pid, pool_name), pool in _pools.items() if pid == os.getpid() and name in (None, pool_name)]
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Under the ASGI server every request runs on a fresh thread with its own
+    Django connection, so CONN_MAX_AGE cannot keep one open between requests.
+    Closing hands the sqlite3 connection to a small per-process pool instead,
+    and the next request's connect takes it back, skipping the connect,
+    function registration and PRAGMAs.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        self.pool_size = kwargs.pop('pool_size', 0)
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES's transaction_mode must be one of {', '.join(TRANSACTION_MODES)}"
+            )
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        return kwargs
+
+    def _pool(self):
+        key = (os.getpid(), self.settings_dict['NAME'])
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        if self.pool_size and not self.is_in_memory_db():
+            try:
+                return self._pool().get_nowait()
+            except queue.Empty:
+                pass
+        conn = super().get_new_connection(conn_params)
+        for statement in (self.init_command or '').split(';'):
+            if statement := statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _close(self):
+        if self.connection is not None and getattr(self, 'pool_size', 0) and not self.connection.in_transaction:
+            try:
+                self._pool().put_nowait(self.connection)
+                return
+            except queue.Full:
+                pass
+        super()._close()
+
+    def _start_transaction_under_autocommit(self):
+        # A deferred transaction that reads first and then writes cannot wait
+        # for the write lock if another connection committed in between: it
+        # fails at once with "database is locked". IMMEDIATE takes the lock
+        # up front, where busy_timeout applies.
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
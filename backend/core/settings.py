@@ -48,6 +48,7 @@ MIDDLEWARE = [
   "whitenoise.middleware.WhiteNoiseMiddleware",
   "django.contrib.sessions.middleware.SessionMiddleware",
   "corsheaders.middleware.CorsMiddleware",
+  "files.middleware.AdmissionControlMiddleware",
   "django.middleware.common.CommonMiddleware",
   "django.middleware.csrf.CsrfViewMiddleware",
   "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -79,14 +80,35 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite tuned for several worker processes writing at once (core/db/base.py):
+# WAL lets readers run alongside the single writer, writers wait up to
+# SQLITE_BUSY_TIMEOUT seconds for the lock instead of failing, and atomic()
+# blocks take the write lock when they begin.
 DATABASES = {
   "default": {
-    "ENGINE": "django.db.backends.sqlite3",
+    "ENGINE": "core.db",
     "NAME": os.path.join(BASE_DIR, 'data', 'db.sqlite3'),
+    "OPTIONS": {
+      "timeout": float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+      "transaction_mode": "IMMEDIATE",
+      "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+      # Idle connections kept per process and reused by later requests
+      "pool_size": int(os.environ.get('SQLITE_POOL_SIZE', 8)),
+    },
+    # The pool already makes closing after each request cheap; a longer
+    # CONN_MAX_AGE only helps WSGI servers, whose request threads persist.
+    "CONN_MAX_AGE": int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+    "CONN_HEALTH_CHECKS": True,
   }
 }
 
 
+# Written by `manage.py migrate_if_needed` after a successful migrate; start.sh
+# skips migrate while migration files and the database file are unchanged.
+# Delete it to force a full check.
+MIGRATION_FINGERPRINT_FILE = os.path.join(BASE_DIR, 'data', 'migrations.fingerprint')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -129,6 +151,14 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Blob volumes for files.storage.VolumeStorage, as `name=path:weight,...`.
+# Weight 0 drains a volume; run `manage.py rebalance_storage` after changes.
+DEFAULT_FILE_STORAGE = 'files.storage.VolumeStorage'
+STORAGE_VOLUMES = [{'name': 'default', 'path': MEDIA_ROOT, 'weight': 1}]
+if os.environ.get('STORAGE_VOLUMES'):
+  from files.storage import parse_volumes
+  STORAGE_VOLUMES = parse_volumes(os.environ['STORAGE_VOLUMES'])
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -146,6 +176,55 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Server-Sent Events (/api/events/, served by the ASGI app)
+SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+SSE_MAX_PENDING_EVENTS = int(os.environ.get('SSE_MAX_PENDING_EVENTS', 100))
+# How often each worker checks the FileChange log for changes made by other workers
+SSE_POLL_SECONDS = float(os.environ.get('SSE_POLL_SECONDS', 1))
+
+# Per-process admission control (files/admission.py). Uploads beyond the
+# in-flight count/bytes caps wait in a bounded queue, then get 503 + Retry-After;
+# reads have their own budget so listings stay fast during an upload burst.
+ADMISSION_CONTROL = {
+  'uploads': {
+    'max_concurrent': int(os.environ.get('UPLOAD_MAX_CONCURRENT', 4)),
+    'max_bytes': int(os.environ.get('UPLOAD_MAX_INFLIGHT_MB', 64)) * 1024 * 1024,
+    'max_queue': int(os.environ.get('UPLOAD_MAX_QUEUE', 8)),
+    'queue_timeout': float(os.environ.get('UPLOAD_QUEUE_TIMEOUT', 5)),
+    'retry_after': 5,
+  },
+  'reads': {
+    'max_concurrent': int(os.environ.get('READ_MAX_CONCURRENT', 32)),
+    'max_queue': int(os.environ.get('READ_MAX_QUEUE', 64)),
+    'queue_timeout': float(os.environ.get('READ_QUEUE_TIMEOUT', 2)),
+    'retry_after': 1,
+  },
+}
+
+# Read-through cache of File rows by id and hash (files/cache.py). Set
+# FILE_CACHE_SHARED_ALIAS to a CACHES alias (e.g. Redis) to share entries
+# between processes on top of the per-process LRU.
+FILE_CACHE = {
+  'max_entries': int(os.environ.get('FILE_CACHE_MAX_ENTRIES', 10000)),
+  'ttl': int(os.environ.get('FILE_CACHE_TTL', 60)),
+  'negative_ttl': int(os.environ.get('FILE_CACHE_NEGATIVE_TTL', 10)),
+  'shared_alias': os.environ.get('FILE_CACHE_SHARED_ALIAS') or None,
+}
+
+# How GET /api/files/ counts results (files/counts.py): 'exact' runs COUNT(*)
+# every time, 'cached' reuses it until the next file change, 'estimate' samples
+# tables above `estimate_above` rows and labels the total as approximate.
+# Clients can pick one per request with ?count=.
+FILE_LIST_COUNT = {
+  'strategy': os.environ.get('FILE_LIST_COUNT_STRATEGY', 'exact'),
+  'cache_ttl': int(os.environ.get('FILE_LIST_COUNT_CACHE_TTL', 300)),
+  'estimate_above': int(os.environ.get('FILE_LIST_COUNT_ESTIMATE_ABOVE', 100000)),
+  'sample_size': int(os.environ.get('FILE_LIST_COUNT_SAMPLE_SIZE', 2000)),
+}
+
+# Full-text index of PDF contents (files/content_index.py)
+CONTENT_INDEX_MAX_CHARS = int(os.environ.get('CONTENT_INDEX_MAX_CHARS', 1_000_000))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Configure appropriately in production
 CORS_ALLOW_CREDENTIALS = True
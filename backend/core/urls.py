@@ -15,11 +15,15 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from files.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('files.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Like django.conf.urls.static.static(), but reading through the storage
+    # backend so blobs on every volume are served (only when DEBUG is on)
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
+]
@@ -0,0 +1,133 @@
+import threading
+import time
+from django.conf import settings
+
+UPLOAD_PATH = '/api/files/'
+# Long-lived streams would pin a read slot for their whole lifetime
+UNLIMITED_PATHS = ('/api/events/',)
+
+# Marker set on the ASGI scope once an upload was admitted before Django ran
+ADMITTED_SCOPE_KEY = 'files.admitted'
+
+
+class Limiter:
+    """
+    Per-process admission limiter: at most `max_concurrent` requests and
+    `max_bytes` of declared request bodies in flight. Up to `max_queue`
+    requests may wait `queue_timeout` seconds for room; anyone beyond that is
+    turned away immediately so overload is shed instead of queued.
+    """
+
+    def __init__(self, max_concurrent, max_bytes=None, max_queue=0, queue_timeout=0.0, retry_after=1):
+        self.max_concurrent = max_concurrent
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def _cost(self, cost):
+        # A body larger than the whole budget may still run, just alone
+        return min(cost, self.max_bytes) if self.max_bytes else 0
+
+    def _has_room(self, cost):
+        if self.in_flight >= self.max_concurrent:
+            return False
+        return not self.max_bytes or self.in_flight_bytes + cost <= self.max_bytes
+
+    def _admit(self, cost):
+        self.in_flight += 1
+        self.in_flight_bytes += cost
+
+    def try_acquire(self, cost=0):
+        """Admit without waiting; False if there is no room or others are queued"""
+        cost = self._cost(cost)
+        with self._condition:
+            if self.waiting == 0 and self._has_room(cost):
+                self._admit(cost)
+                return True
+            return False
+
+    def acquire(self, cost=0):
+        """Admit, waiting in the bounded queue if needed; False when shed"""
+        cost = self._cost(cost)
+        with self._condition:
+            if self.waiting == 0 and self._has_room(cost):
+                self._admit(cost)
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while not self._has_room(cost):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._condition.wait(remaining)
+                self._admit(cost)
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, cost=0):
+        cost = self._cost(cost)
+        with self._condition:
+            self.in_flight -= 1
+            self.in_flight_bytes -= cost
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'in_flight': self.in_flight,
+                'in_flight_bytes': self.in_flight_bytes,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(budget):
+    """The process-wide Limiter for `budget` ('uploads' or 'reads') from ADMISSION_CONTROL"""
+    with _limiters_lock:
+        if budget not in _limiters:
+            _limiters[budget] = Limiter(**settings.ADMISSION_CONTROL[budget])
+        return _limiters[budget]
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def classify(method, path):
+    """Which budget a request draws from, or None if it is not limited"""
+    if path.startswith(UNLIMITED_PATHS):
+        return None
+    if method == 'POST' and path == UPLOAD_PATH:
+        return 'uploads'
+    if method in ('GET', 'HEAD') and path.startswith('/api/'):
+        return 'reads'
+    return None
+
+
+def declared_size(content_length):
+    """Body size the client announced; unknown sizes count as the largest allowed upload"""
+    try:
+        return max(int(content_length), 0)
+    except (TypeError, ValueError):
+        from .views import FileViewSet
+        return FileViewSet.MAX_FILE_SIZE
+
+
+BUSY_BODY = b'{"error":"Server is busy, please retry later"}'
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Stored for hashes known not to exist (negative caching)
+ABSENT = '__absent__'
+
+
+class FileCache:
+    """
+    Read-through cache of File rows by id and by hash.
+
+    Level 1 is a per-process LRU bounded by `max_entries`; level 2 is an
+    optional shared Django cache (`shared_alias`). Both hold plain field
+    dicts. Rows only change through reference_count updates and deletes,
+    which invalidate them here; other processes catch up within `ttl`
+    seconds, and callers that write (the dedup path) re-check the database.
+    """
+
+    def __init__(self, max_entries, ttl, negative_ttl, shared_alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared_alias = shared_alias
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ['local_hits', 'shared_hits', 'negative_hits', 'misses', 'evictions', 'invalidations'], 0
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value, ttl):
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _store(self, key, value):
+        ttl = self.negative_ttl if value == ABSENT else self.ttl
+        self._set_local(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def _lookup(self, key, load):
+        value = self._get_local(key)
+        if value is not None:
+            self._count('negative_hits' if value == ABSENT else 'local_hits')
+        elif self.shared is not None and (value := self.shared.get(key)) is not None:
+            self._count('negative_hits' if value == ABSENT else 'shared_hits')
+            self._set_local(key, value, self.negative_ttl if value == ABSENT else self.ttl)
+        else:
+            self._count('misses')
+            value = load()
+            if value is None:
+                # Only hashes get negative entries; unknown ids are just misses
+                if key.startswith('file:hash:'):
+                    self._store(key, ABSENT)
+                return None
+            self._store(key, value)
+            other_key = f"file:id:{value['id']}" if key.startswith('file:hash:') else f"file:hash:{value['hash']}"
+            self._store(other_key, value)
+        return None if value == ABSENT else self._to_instance(value)
+
+    @staticmethod
+    def _to_instance(record):
+        from .models import File
+        return File.from_db('default', list(record), list(record.values()))
+
+    @staticmethod
+    def _load(**lookup):
+        from .models import File
+        field_names = [field.attname for field in File._meta.concrete_fields]
+        return File.objects.filter(**lookup).values(*field_names).first()
+
+    def get_by_id(self, file_id):
+        return self._lookup(f'file:id:{file_id}', lambda: self._load(id=file_id))
+
+    def get_by_hash(self, file_hash):
+        return self._lookup(f'file:hash:{file_hash}', lambda: self._load(hash=file_hash))
+
+    def invalidate(self, file_id=None, file_hash=None):
+        """
+        Drop cached entries after a reference count change, delete or create.
+        Inside a transaction they are dropped again once it commits: until
+        then a concurrent read still sees the old row and may cache it again.
+        """
+        keys = []
+        if file_id is not None:
+            keys.append(f'file:id:{file_id}')
+        if file_hash is not None:
+            keys.append(f'file:hash:{file_hash}')
+        with self._lock:
+            self._stats['invalidations'] += 1
+        self._drop(keys)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._drop(keys))
+
+    def _drop(self, keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete_many(keys)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, local_entries=len(self._local), max_entries=self.max_entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 4) if lookups else None
+        stats['shared_cache'] = self.shared_alias
+        return stats
+
+
+file_cache = FileCache(**settings.FILE_CACHE)
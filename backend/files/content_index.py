@@ -0,0 +1,160 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models.expressions import RawSQL
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PyPdfError
+except ImportError:  # pragma: no cover - pypdf is optional at runtime
+    PdfReader = None
+
+# SQLite FTS5 table created in migration 0009; one row per blob, keyed by File.hash
+FTS_TABLE = 'files_content_fts'
+PDF_CONTENT_TYPES = {'application/pdf'}
+
+_executor = None
+
+
+def extract_text(fileobj):
+    """Plain text of a PDF, truncated to CONTENT_INDEX_MAX_CHARS; '' if unreadable"""
+    if PdfReader is None:
+        return ''
+    limit = settings.CONTENT_INDEX_MAX_CHARS
+    parts, length = [], 0
+    try:
+        for page in PdfReader(fileobj).pages:
+            text = page.extract_text() or ''
+            parts.append(text)
+            length += len(text)
+            if length >= limit:
+                break
+    except (PyPdfError, OSError, ValueError, KeyError, TypeError):
+        # Broken PDFs raise all sorts; index whatever pages were readable
+        pass
+    return '\n'.join(parts)[:limit]
+
+
+def to_match_query(text):
+    """
+    Turn free text into an FTS5 query matching all terms, so user input is
+    never parsed as FTS5 syntax. A trailing `*` on a term keeps prefix search.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith('*')
+        term = re.sub(r'["*]', '', term)
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def is_indexed(file_hash):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {FTS_TABLE} WHERE hash = %s LIMIT 1', [file_hash])
+        return cursor.fetchone() is not None
+
+
+def index_text(file_hash, text):
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE hash = %s', [file_hash])
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (hash, body) VALUES (%s, %s)', [file_hash, text])
+
+
+def remove(file_hash):
+    """Drop a blob's text; call when its last reference is deleted"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE hash = %s', [file_hash])
+
+
+def index_file(instance):
+    """
+    Extract and index one PDF File. Blobs are unique per hash, so a hash that
+    is already indexed is skipped. Unreadable PDFs are indexed with empty text
+    so they are not retried.
+    """
+    if instance.file_type not in PDF_CONTENT_TYPES or is_indexed(instance.hash):
+        return False
+    try:
+        with instance.file.open('rb') as source:
+            text = extract_text(source)
+    except FileNotFoundError:
+        return False
+    index_text(instance.hash, text)
+    return True
+
+
+def index_pending(batch_size=100):
+    """Index every PDF whose hash is not in the index yet; returns the count"""
+    from .models import File
+    indexed = 0
+    pending = File.objects.filter(file_type__in=PDF_CONTENT_TYPES).exclude(
+        hash__in=RawSQL(f'SELECT hash FROM {FTS_TABLE}', [])
+    )
+    for instance in pending.iterator(chunk_size=batch_size):
+        indexed += index_file(instance)
+    return indexed
+
+
+def _index_in_background(file_id):
+    from .models import File
+    close_old_connections()
+    try:
+        instance = File.objects.filter(id=file_id).first()
+        if instance is not None:
+            index_file(instance)
+    finally:
+        close_old_connections()
+
+
+def schedule(instance):
+    """Queue extraction for a new PDF once the upload transaction commits"""
+    global _executor
+    if instance.file_type not in PDF_CONTENT_TYPES:
+        return
+    if _executor is None:
+        # A single worker: SQLite takes one writer at a time anyway
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='content-index')
+    file_id = instance.id
+    transaction.on_commit(lambda: _executor.submit(_index_in_background, file_id))
+
+
+def matching_hashes(query):
+    """
+    Subquery of blob hashes whose text matches `query`, for `hash__in`
+    filters; None if the query has no searchable terms.
+    """
+    match = to_match_query(query)
+    if not match:
+        return None
+    return RawSQL(f'SELECT hash FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+
+
+def search(query, limit, snippet_chars=160):
+    """
+    Best matches first as (hash, bm25 score, snippet) tuples.
+    Ranking and snippets are separate queries: FTS5's snippet() walks every
+    hit in a document and would run for all matches before the LIMIT, so the
+    snippet is cut around the first literal occurrence of the first term,
+    only for the returned rows.
+    """
+    match = to_match_query(query)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, hash, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [match, limit],
+        )
+        hits = cursor.fetchall()
+        if not hits:
+            return []
+        first_term = match.split('"')[1].lower()
+        cursor.execute(
+            f'SELECT rowid, substr(body, max(instr(lower(body), %s) - %s, 1), %s) FROM {FTS_TABLE} '
+            f'WHERE rowid IN ({", ".join(["%s"] * len(hits))})',
+            [first_term, snippet_chars // 2, snippet_chars, *[hit[0] for hit in hits]],
+        )
+        snippets = {rowid: ' '.join(text.split()) for rowid, text in cursor.fetchall()}
+    return [(file_hash, score, snippets.get(rowid, '')) for rowid, file_hash, score in hits]
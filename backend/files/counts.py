@@ -0,0 +1,70 @@
+import hashlib
+import random
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Sum
+from .models import File, FileChange, FileFacet
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATE = 'estimate'
+STRATEGIES = (EXACT, CACHED, ESTIMATE)
+
+# Below this many sampled matches the estimate is too noisy; count exactly instead
+MIN_SAMPLE_MATCHES = 20
+
+
+def table_rows():
+    """Rows in the File table, read from the file type rollups instead of COUNT(*)"""
+    return FileFacet.objects.filter(dimension=FileFacet.FILE_TYPE).aggregate(rows=Sum('count'))['rows'] or 0
+
+
+def cached_count(queryset):
+    """
+    Exact count of `queryset`, memoized per SQL statement. Every create,
+    reference and delete appends a FileChange, so keying on the newest change
+    id invalidates all cached counts on writes, in every process.
+    """
+    generation = FileChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+    statement = hashlib.sha1(str(queryset.query).encode()).hexdigest()
+    key = f'file-count:{generation}:{statement}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.FILE_LIST_COUNT['cache_ttl'])
+    return count
+
+
+def estimated_count(queryset, rows):
+    """
+    Scale the share of sampled rows matching `queryset` up to `rows`; None if
+    too few match. uuid4 keys are uniformly random, so a run of the primary
+    key index from a random UUID is an unbiased sample. With planner
+    statistics (see warmup.py) SQLite applies the filters to that run only,
+    so the cost is O(sample_size) whatever the table size.
+    """
+    if not queryset.query.where:
+        return rows
+    size = settings.FILE_LIST_COUNT['sample_size']
+    # Leave room for a full sample after the pivot
+    pivot = uuid.UUID(int=random.randrange(max(1, int(2 ** 128 * max(0.0, 1 - size / rows)))))
+    sample = File.objects.filter(pk__gte=pivot).order_by('pk').values('pk')[:size]
+    sampled = File.objects.filter(pk__in=sample).count()
+    matches = queryset.filter(pk__in=sample).count()
+    if matches < MIN_SAMPLE_MATCHES:
+        return None
+    return round(rows * matches / sampled)
+
+
+def count_files(queryset, strategy):
+    """Return (count, approximate) for a File listing using `strategy`"""
+    if strategy == EXACT:
+        return queryset.count(), False
+    if strategy == ESTIMATE:
+        rows = table_rows()
+        if rows > settings.FILE_LIST_COUNT['estimate_above']:
+            estimate = estimated_count(queryset, rows)
+            if estimate is not None:
+                return estimate, True
+    return cached_count(queryset), False
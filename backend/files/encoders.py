@@ -0,0 +1,72 @@
+import json
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Columns needed to produce FileSerializer output, in serializer field order
+FILE_LIST_FIELDS = ('id', 'file', 'original_filename', 'file_type', 'size', 'uploaded_at')
+
+
+def _format_datetime(value, tz):
+    """Mirror DRF's DateTimeField ISO 8601 output"""
+    if not value:
+        return None
+    value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def make_file_row_encoder(request, storage):
+    """
+    Build a function turning a `File.objects.values(*FILE_LIST_FIELDS)` row
+    into the same dict FileSerializer produces.
+
+    The media URL prefix is resolved once per request instead of once per row.
+    """
+    media_prefix = storage.url('')
+    if request is not None:
+        media_prefix = request.build_absolute_uri(media_prefix)
+    tz = timezone.get_current_timezone()
+
+    def encode(row):
+        name = row['file']
+        return {
+            'id': str(row['id']),
+            'file': media_prefix + filepath_to_uri(name).lstrip('/') if name else None,
+            'original_filename': row['original_filename'],
+            'file_type': row['file_type'],
+            'size': row['size'],
+            'uploaded_at': _format_datetime(row['uploaded_at'], tz),
+        }
+
+    return encode
+
+
+def render_json(data):
+    """
+    Serialize `data` to the same bytes as DRF's JSONRenderer with default
+    settings, using orjson when it is installed.
+    """
+    if orjson is not None:
+        ret = orjson.dumps(data)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    ret = json.dumps(
+        data,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':'),
+    )
+    return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def iter_ndjson(rows, encode):
+    """Yield one JSON document per row, newline separated"""
+    for row in rows:
+        yield render_json(encode(row)) + b'\n'
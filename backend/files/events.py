@@ -0,0 +1,248 @@
+import asyncio
+import threading
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from .encoders import render_json
+
+# Path the SSE endpoint is mounted on in core/asgi.py
+EVENTS_PATH = '/api/events/'
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + render_json(data).decode())
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class Subscription:
+    """
+    Per-connection mailbox. File events go through a bounded queue; storage
+    snapshots only keep the latest one, so a slow client sees fewer of them
+    instead of a growing backlog. If the event queue overflows the client is
+    told to resync and disconnected.
+    """
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.snapshot = None
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+        self._wakeup.set()
+
+    def deliver_snapshot(self, message):
+        self.snapshot = message
+        self._wakeup.set()
+
+    async def next_message(self, timeout):
+        """Return the next message to send, or None if `timeout` passed idle"""
+        while True:
+            if self.overflowed:
+                raise OverflowError('Subscriber fell too far behind')
+            if not self.queue.empty():
+                return self.queue.get_nowait()
+            if self.snapshot is not None:
+                message, self.snapshot = self.snapshot, None
+                return message
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+class Broadcaster:
+    """
+    In-process fan-out of file and storage events to SSE subscribers.
+    Messages are encoded once per change and handed to every subscriber's
+    event loop, so a database change costs one notification, not one query
+    per open dashboard. Publishing is thread-safe; the change feed below is
+    the only publisher.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, max_pending):
+        subscription = Subscription(asyncio.get_running_loop(), max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _dispatch(self, method, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(getattr(subscription, method), message)
+            except RuntimeError:
+                # Event loop already closed; the connection is gone
+                self.unsubscribe(subscription)
+
+    def publish_change(self, change):
+        """Broadcast a FileChange as a `file.<event>` message"""
+        from .serializers import FileChangeSerializer
+        data = FileChangeSerializer(change).data
+        self._dispatch('deliver', format_event(f'file.{change.event}', data, change.id))
+
+    def publish_storage(self, metadata):
+        """Broadcast a StorageMetadata snapshot; subscribers coalesce these"""
+        self._dispatch('deliver_snapshot', storage_event(metadata))
+
+
+def storage_event(metadata):
+    from .serializers import StorageMetadataSerializer
+    return format_event('storage', StorageMetadataSerializer(metadata).data)
+
+
+class ChangeFeed:
+    """
+    Follows the FileChange log for this process's subscribers. Every worker
+    writes to the same log, so one polling thread per process sees the
+    changes made by all of them; each new change is published once and
+    followed by a single storage snapshot. The thread runs only while
+    someone is subscribed and starts from the newest change, so nothing
+    is replayed. Commits in this process wake it early.
+    """
+
+    # Changes read per query while catching up
+    BATCH_SIZE = 500
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """Start the polling thread unless it is already running"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def latest(self):
+        from .models import FileChange
+        return FileChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def poll(self, after):
+        """Publish the changes after id `after`; return the id to continue from"""
+        from .models import FileChange, StorageMetadata
+        published = after
+        while True:
+            changes = list(FileChange.objects.filter(id__gt=published).order_by('id')[:self.BATCH_SIZE])
+            for change in changes:
+                self.hub.publish_change(change)
+            if changes:
+                published = changes[-1].id
+            if len(changes) < self.BATCH_SIZE:
+                break
+        if published != after:
+            self.hub.publish_storage(StorageMetadata.get_instance())
+        return published
+
+    def _run(self):
+        after = None
+        try:
+            while True:
+                with self._lock:
+                    if not self.hub.subscriber_count():
+                        self._thread = None
+                        return
+                try:
+                    after = self.latest() if after is None else self.poll(after)
+                except DatabaseError:
+                    # Retry on a fresh connection at the next poll
+                    connection.close()
+                self._wakeup.wait(settings.SSE_POLL_SECONDS)
+                self._wakeup.clear()
+        finally:
+            connection.close()
+
+
+broadcaster = Broadcaster()
+change_feed = ChangeFeed(broadcaster)
+
+
+def notify_on_commit():
+    """Have the change feed pick up this transaction's changes as soon as it commits"""
+    transaction.on_commit(change_feed.wake)
+
+
+async def sse_app(scope, receive, send):
+    """
+    ASGI app streaming change feed events as `text/event-stream`.
+    Sends the current storage snapshot on connect, then file and storage
+    events as they are committed by any worker, and a comment line as
+    heartbeat when idle.
+    """
+    from asgiref.sync import sync_to_async
+    from .models import StorageMetadata
+
+    if scope['method'] != 'GET':
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    headers = [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    if origin and getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
+        headers.append((b'access-control-allow-origin', origin))
+
+    subscription = broadcaster.subscribe(settings.SSE_MAX_PENDING_EVENTS)
+    change_feed.start()
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        metadata = await sync_to_async(StorageMetadata.get_instance)()
+        subscription.deliver_snapshot(storage_event(metadata))
+        while not disconnected.is_set():
+            next_message = asyncio.create_task(subscription.next_message(settings.SSE_HEARTBEAT_SECONDS))
+            disconnect = asyncio.create_task(disconnected.wait())
+            done, _ = await asyncio.wait({next_message, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if next_message not in done:
+                next_message.cancel()
+                break
+            disconnect.cancel()
+            try:
+                message = next_message.result()
+            except OverflowError:
+                await send({'type': 'http.response.body', 'body': format_event('resync', {}), 'more_body': True})
+                break
+            await send({'type': 'http.response.body', 'body': message or b': heartbeat\n\n', 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        broadcaster.unsubscribe(subscription)
+        watcher.cancel()
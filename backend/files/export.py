@@ -0,0 +1,98 @@
+import os
+import zipfile
+
+# Content types that are already compressed; deflating them again only burns CPU
+STORED_CONTENT_TYPES = {
+    'application/pdf',
+    'application/zip',
+    'application/gzip',
+    'image/png',
+    'image/jpeg',
+    'image/jpg',
+    'image/gif',
+    'image/webp',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        # zipfile needs the running offset for local header positions
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def unique_archive_name(filename, seen):
+    """Return `filename`, or `name (n).ext` if it was already used in this archive"""
+    name = os.path.basename(filename) or 'file'
+    if name.lower() not in seen:
+        seen.add(name.lower())
+        return name
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while True:
+        candidate = f"{stem} ({counter}){ext}"
+        if candidate.lower() not in seen:
+            seen.add(candidate.lower())
+            return candidate
+        counter += 1
+
+
+def stream_zip(files):
+    """
+    Yield a ZIP archive of the given File instances chunk by chunk.
+
+    The archive is written to a non-seekable buffer so zipfile emits data
+    descriptors, and ZIP64 records are added automatically once the entry
+    count or offsets exceed the classic limits. Only one read chunk is held
+    in memory at a time, and nothing is written to disk.
+    """
+    sink = _StreamBuffer()
+    seen = set()
+    with zipfile.ZipFile(sink, mode='w', allowZip64=True) as archive:
+        for instance in files:
+            zinfo = zipfile.ZipInfo(
+                unique_archive_name(instance.original_filename, seen),
+                date_time=instance.uploaded_at.timetuple()[:6],
+            )
+            zinfo.file_size = instance.size
+            zinfo.external_attr = 0o644 << 16
+            if instance.file_type in STORED_CONTENT_TYPES:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+
+            try:
+                source = instance.file.open('rb')
+            except FileNotFoundError:
+                # Blob missing from storage; leave it out rather than abort the stream
+                seen.discard(zinfo.filename.lower())
+                continue
+            with source, archive.open(zinfo, mode='w', force_zip64=instance.size > zipfile.ZIP64_LIMIT) as entry:
+                while chunk := source.read(CHUNK_SIZE):
+                    entry.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    # Central directory (and ZIP64 end records) are written on close
+    yield sink.drain()
@@ -0,0 +1,73 @@
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from .models import FileFacet
+
+# Sizes up to 2**44 bytes; uploads are capped far below that
+_SIZE_BUCKET = Case(
+    *[When(size__lt=2 ** bucket, then=Value(bucket)) for bucket in range(45)],
+    output_field=IntegerField(),
+)
+
+
+def _entry(count, size):
+    return {'count': count, 'bytes': size or 0}
+
+
+def format_facets(file_types, size_buckets, upload_days, source):
+    """
+    Shape facet totals for the API. Each argument maps a facet value to a
+    (count, bytes) pair; size buckets are keyed by their log2 bucket number.
+    """
+    return {
+        'file_types': [
+            {'file_type': value, **_entry(*totals)}
+            for value, totals in sorted(file_types.items(), key=lambda item: -item[1][0])
+        ],
+        'size_buckets': [
+            {
+                'bucket': bucket,
+                'min_size': 2 ** (bucket - 1) if bucket else 0,
+                'max_size': 2 ** bucket - 1,
+                **_entry(*totals),
+            }
+            for bucket, totals in sorted(size_buckets.items())
+        ],
+        'upload_days': [
+            {'date': day, **_entry(*totals)}
+            for day, totals in sorted(upload_days.items(), reverse=True)
+        ],
+        'source': source,
+    }
+
+
+def rollup_facets():
+    """Facets for the whole table, read from the FileFacet rollups"""
+    grouped = {FileFacet.FILE_TYPE: {}, FileFacet.SIZE_BUCKET: {}, FileFacet.UPLOAD_DAY: {}}
+    for dimension, value, count, size in FileFacet.objects.filter(count__gt=0).values_list(
+        'dimension', 'value', 'count', 'bytes'
+    ):
+        grouped[dimension][int(value) if dimension == FileFacet.SIZE_BUCKET else value] = (count, size)
+    return format_facets(
+        grouped[FileFacet.FILE_TYPE], grouped[FileFacet.SIZE_BUCKET], grouped[FileFacet.UPLOAD_DAY], 'rollup'
+    )
+
+
+def query_facets(queryset):
+    """
+    Facets for a filtered queryset, one GROUP BY per facet. file_type, size
+    and uploaded_at are all in idx_file_composite, so filters on those
+    columns are answered from the index alone.
+    """
+    queryset = queryset.order_by()
+
+    def grouped(key, **annotations):
+        rows = queryset.annotate(**annotations).values(key).annotate(count=Count('*'), total=Sum('size'))
+        return {row[key]: (row['count'], row['total']) for row in rows}
+
+    days = grouped('day', day=TruncDate('uploaded_at'))
+    return format_facets(
+        grouped('file_type'),
+        grouped('bucket', bucket=_SIZE_BUCKET),
+        {day.isoformat(): totals for day, totals in days.items()},
+        'query',
+    )
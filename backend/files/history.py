@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from .models import StorageHistory, StorageMetadata
+
+# Each coarser resolution is rolled up from the next finer one
+FINER = {StorageHistory.HOUR: StorageHistory.MINUTE, StorageHistory.DAY: StorageHistory.HOUR}
+WATERMARKS = {StorageHistory.HOUR: 'history_hours_until', StorageHistory.DAY: 'history_days_until'}
+# Deltas are bucketed when recorded but may commit a little later; leave recent minutes alone
+SETTLE = timedelta(minutes=2)
+
+
+def _zeros():
+    return [0] * len(StorageHistory.VALUE_FIELDS)
+
+
+def _add(totals, bucket, values):
+    row = totals[bucket]
+    for index, value in enumerate(values):
+        row[index] += value
+
+
+def _rows(resolution, start, end):
+    return StorageHistory.objects.filter(
+        resolution=resolution, bucket__gte=start, bucket__lt=end
+    ).values_list('bucket', *StorageHistory.VALUE_FIELDS)
+
+
+def _rollup(metadata, resolution, until):
+    """Fold the finer rows between the watermark and `until` into `resolution` rows"""
+    finer = FINER[resolution]
+    start = getattr(metadata, WATERMARKS[resolution])
+    if start is None:
+        first = StorageHistory.objects.filter(resolution=finer).order_by('bucket').values_list('bucket', flat=True).first()
+        if first is None:
+            return 0
+        start = StorageHistory.truncate(first, resolution)
+    if start >= until:
+        return 0
+
+    totals = defaultdict(_zeros)
+    for bucket, *values in _rows(finer, start, until):
+        _add(totals, StorageHistory.truncate(bucket, resolution), values)
+    StorageHistory.objects.bulk_create([
+        StorageHistory(resolution=resolution, bucket=bucket, **dict(zip(StorageHistory.VALUE_FIELDS, values)))
+        for bucket, values in totals.items()
+    ], batch_size=1000)
+    return len(totals)
+
+
+def downsample(now, minute_retention, hour_retention, day_retention=None):
+    """
+    Roll complete minutes into hours and complete hours into days, then drop
+    rows past their retention. Rows are only dropped once rolled up, and
+    watermarks on StorageMetadata make reruns safe.
+    """
+    with transaction.atomic():
+        metadata = StorageMetadata.get_instance()
+        hours_until = StorageHistory.truncate(now - SETTLE, StorageHistory.HOUR)
+        hours_until = max(hours_until, metadata.history_hours_until or hours_until)
+        hours = _rollup(metadata, StorageHistory.HOUR, hours_until)
+        metadata.history_hours_until = hours_until
+
+        days_until = StorageHistory.truncate(hours_until, StorageHistory.DAY)
+        days_until = max(days_until, metadata.history_days_until or days_until)
+        days = _rollup(metadata, StorageHistory.DAY, days_until)
+        metadata.history_days_until = days_until
+        metadata.save(update_fields=['history_hours_until', 'history_days_until'])
+
+        expired = [
+            (StorageHistory.MINUTE, min(now - minute_retention, hours_until)),
+            (StorageHistory.HOUR, min(now - hour_retention, days_until)),
+        ]
+        if day_retention is not None:
+            expired.append((StorageHistory.DAY, now - day_retention))
+        purged = 0
+        for resolution, before in expired:
+            deleted, _ = StorageHistory.objects.filter(resolution=resolution, bucket__lt=before).delete()
+            purged += deleted
+    return {'hours': hours, 'days': days, 'purged': purged}
+
+
+def _series(metadata, resolution, start, end):
+    """Totals per `resolution` bucket in [start, end), taking what is not rolled up yet from finer rows"""
+    if resolution == StorageHistory.MINUTE:
+        rolled = end
+    else:
+        rolled = min(max(start, getattr(metadata, WATERMARKS[resolution]) or start), end)
+
+    totals = defaultdict(_zeros)
+    for bucket, *values in _rows(resolution, start, rolled):
+        _add(totals, bucket, values)
+    if rolled < end:
+        for bucket, values in _series(metadata, FINER[resolution], rolled, end).items():
+            _add(totals, StorageHistory.truncate(bucket, resolution), values)
+    return totals
+
+
+def storage_history(resolution, start, end):
+    """
+    Every `resolution` bucket overlapping [start, end) with the changes to the
+    storage totals in it. Reads one row per bucket plus the not yet rolled up
+    tail, so the cost follows the range, not the number of files.
+    """
+    start = StorageHistory.truncate(start, resolution)
+    totals = _series(StorageMetadata.get_instance(), resolution, start, end)
+    buckets = []
+    bucket = start
+    while bucket < end:
+        buckets.append({'bucket': bucket, **dict(zip(StorageHistory.VALUE_FIELDS, totals.get(bucket) or _zeros()))})
+        bucket += StorageHistory.STEPS[resolution]
+    return buckets
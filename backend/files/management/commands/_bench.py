@@ -0,0 +1,56 @@
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from files.models import File
+
+FILE_TYPES = ['application/pdf', 'image/png', 'image/jpeg']
+
+
+@contextmanager
+def rollback():
+    """Run a benchmark inside a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_files(count, batch_size=5000):
+    """Bulk insert `count` synthetic File rows (no blobs on disk)"""
+    now = timezone.now()
+    # Let the synthetic upload dates through instead of auto_now_add stamping "now"
+    uploaded_at = File._meta.get_field('uploaded_at')
+    uploaded_at.auto_now_add = False
+    try:
+        _bulk_create(count, batch_size, now)
+    finally:
+        uploaded_at.auto_now_add = True
+
+
+def _bulk_create(count, batch_size, now):
+    for start in range(0, count, batch_size):
+        File.objects.bulk_create([
+            File(
+                id=uuid.uuid4(),
+                file=f'uploads/{uuid.uuid4()}.pdf',
+                original_filename=f'document_{index}.pdf',
+                hash=hashlib.sha256(str(index).encode()).hexdigest(),
+                file_type=FILE_TYPES[index % len(FILE_TYPES)],
+                size=1024 + (index * 7919) % (10 * 1024 * 1024),
+                uploaded_at=now - timedelta(minutes=index),
+            )
+            for index in range(start, min(start + batch_size, count))
+        ])
+
+
+def timed(func, repeat):
+    """Return the best wall time in seconds of `repeat` calls to `func`"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
@@ -0,0 +1,102 @@
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+from django.test import Client
+from files.models import File
+from files.storage import VolumeStorage
+
+# Settings applied over DATABASES['default'] for each run
+PROFILES = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    # WAL and busy timeout, but transactions still BEGIN DEFERRED
+    'wal': {'OPTIONS': {**settings.DATABASES['default']['OPTIONS'], 'transaction_mode': None}},
+    'tuned': {},
+}
+
+
+def use_database(database):
+    connections['default'].close()
+    connections['default'] = load_backend(database['ENGINE']).DatabaseWrapper(database, 'default')
+
+
+def upload(args):
+    """Worker process: post `count` uploads, every `duplicate_every`-th one a shared blob"""
+    worker, count, duplicate_every = args
+    client = Client()
+    statuses, errors, latencies = Counter(), Counter(), []
+    for index in range(count):
+        content = b'shared blob' if index % duplicate_every == 0 else f'blob {worker}-{index}'.encode()
+        started = time.perf_counter()
+        response = client.post('/api/files/', {
+            'file': SimpleUploadedFile(f'{worker}-{index}.jpg', content, content_type='image/jpeg'),
+        })
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+        if response.status_code >= 500:
+            errors[response.json().get('error')] += 1
+    connections.close_all()
+    return statuses, errors, latencies
+
+
+class Command(BaseCommand):
+    help = 'Concurrent uploads from several processes against stock and tuned SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--uploads', type=int, default=200, help='Uploads per process')
+        parser.add_argument('--duplicate-every', type=int, default=5,
+                            help='Every Nth upload repeats a shared blob (reference count update)')
+
+    def handle(self, *args, **options):
+        original = connections['default'].settings_dict
+        field = File._meta.get_field('file')
+        storage = field.storage
+        self.stdout.write(
+            f"{'profile':>8} {'uploads/s':>10} {'ok':>6} {'failed':>7} {'p50 ms':>7} {'p95 ms':>7}  errors"
+        )
+        # Failed uploads are counted below instead of logged one by one
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                field.storage = VolumeStorage(volumes=[
+                    {'name': 'bench', 'path': os.path.join(directory, 'media'), 'weight': 1},
+                ])
+                for profile, overrides in PROFILES.items():
+                    self.run(profile, {**original, **overrides, 'NAME': os.path.join(directory, f'{profile}.sqlite3')},
+                             options)
+        finally:
+            field.storage = storage
+            use_database(original)
+
+    def run(self, profile, database, options):
+        use_database(database)
+        call_command('migrate', verbosity=0)
+        connections.close_all()
+
+        jobs = [(worker, options['uploads'], options['duplicate_every']) for worker in range(options['processes'])]
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            results = pool.map(upload, jobs)
+        elapsed = time.perf_counter() - started
+
+        statuses, errors, latencies = Counter(), Counter(), []
+        for worker_statuses, worker_errors, worker_latencies in results:
+            statuses.update(worker_statuses)
+            errors.update(worker_errors)
+            latencies.extend(worker_latencies)
+        ok = statuses[200] + statuses[201]
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1e3
+        self.stdout.write(
+            f"{profile:>8} {ok / elapsed:>10.1f} {ok:>6} {len(latencies) - ok:>7} "
+            f"{statistics.median(latencies) * 1e3:>7.1f} {p95:>7.1f}  {dict(errors) or ''}"
+        )
@@ -0,0 +1,49 @@
+import hashlib
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from files import content_index
+from ._bench import rollback
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text indexing throughput and query latency on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megabytes', type=int, default=200,
+                            help='Corpus size; use several thousand for a multi-GB run')
+        parser.add_argument('--doc-kb', type=int, default=100)
+        parser.add_argument('--vocabulary', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        words = np.array([f'w{np.base_repr(index, 36).lower()}' for index in range(options['vocabulary'])])
+        # Zipf-distributed word ranks, like natural language
+        ranks = np.clip(rng.zipf(1.2, size=options['doc_kb'] * 1024 // 6 * 4), 1, len(words)) - 1
+        doc_bytes = options['doc_kb'] * 1024
+        average_word = np.mean([len(word) + 1 for word in words[ranks[:10000]]])
+        target = options['megabytes'] * 1024 * 1024
+
+        with rollback():
+            started, indexed_bytes, documents = time.perf_counter(), 0, 0
+            while indexed_bytes < target:
+                text = ' '.join(words[rng.choice(ranks, size=int(doc_bytes / average_word))])
+                content_index.index_text(hashlib.sha256(str(documents).encode()).hexdigest(), text)
+                indexed_bytes += len(text)
+                documents += 1
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Indexed {documents:,} documents, {indexed_bytes / 2 ** 20:,.0f} MB in {elapsed:.1f} s: '
+                f'{indexed_bytes / 2 ** 20 / elapsed:.1f} MB/s, {documents / elapsed:.0f} docs/s'
+            )
+
+            for label, pool in [('common', words[:10]), ('mid', words[100:1000]), ('rare', words[10000:])]:
+                latencies = []
+                for _ in range(options['queries']):
+                    query = ' '.join(rng.choice(pool, size=2))
+                    started = time.perf_counter()
+                    content_index.search(query, 20)
+                    latencies.append(time.perf_counter() - started)
+                p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+                self.stdout.write(f'{label:>6} 2-term ranked query (top 20): p50 {p50:.2f} ms, p95 {p95:.2f} ms')
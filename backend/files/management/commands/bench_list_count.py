@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from files.counts import CACHED, ESTIMATE, count_files
+from files.models import File, FileFacet
+from ._bench import rollback, seed_files, timed
+
+SCENARIOS = {
+    'all': {},
+    'file_type': {'file_type': 'application/pdf'},
+    'size_range': {'size__gte': 1024 * 1024, 'size__lte': 4 * 1024 * 1024},
+    'search': {'original_filename__icontains': 'document_1'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare exact, cached and estimated listing counts against the page query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        # Estimate at any table size so small --rows runs still exercise sampling
+        counting = dict(settings.FILE_LIST_COUNT, estimate_above=0)
+
+        with rollback(), override_settings(FILE_LIST_COUNT=counting):
+            seed_files(options['rows'])
+            FileFacet.rebuild()
+            # Planner statistics, as refreshed at server start by warm_caches
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(
+                f"{'filter':>10} {'rows':>8} {'page ms':>8} {'exact ms':>9} {'cache miss':>10} "
+                f"{'cache hit':>10} {'estimate ms':>12} {'error':>7}"
+            )
+            for name, lookups in SCENARIOS.items():
+                queryset = File.objects.filter(**lookups)
+                exact = queryset.count()
+                page = timed(lambda: list(queryset[:options['page_size']]), repeat) * 1e3
+                exact_ms = timed(queryset.count, repeat) * 1e3
+                cache.clear()
+                miss = timed(lambda: count_files(queryset, CACHED), 1) * 1e3
+                hit = timed(lambda: count_files(queryset, CACHED), repeat) * 1e3
+                estimate_ms = timed(lambda: count_files(queryset, ESTIMATE), repeat) * 1e3
+                estimate, approximate = count_files(queryset, ESTIMATE)
+                error = f"{abs(estimate - exact) / exact:.1%}" if approximate and exact else 'exact'
+                self.stdout.write(
+                    f"{name:>10} {exact:>8} {page:>8.2f} {exact_ms:>9.2f} {miss:>10.2f} "
+                    f"{hit:>10.2f} {estimate_ms:>12.2f} {error:>7}"
+                )
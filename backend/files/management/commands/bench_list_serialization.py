@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from files.encoders import FILE_LIST_FIELDS, make_file_row_encoder, render_json
+from files.models import File
+from files.serializers import FileSerializer
+from ._bench import rollback, seed_files, timed
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row cost of the FileSerializer list path and the fast list path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--page-sizes', default='5,100,1000,10000')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/files/')
+        storage = File._meta.get_field('file').storage
+        renderer = JSONRenderer()
+
+        with rollback():
+            seed_files(options['rows'])
+            self.stdout.write(f"{'page_size':>10} {'serializer us/row':>18} {'fast us/row':>12} {'speedup':>8}")
+            for page_size in [int(size) for size in options['page_sizes'].split(',')]:
+                def serializer_path():
+                    rows = File.objects.all()[:page_size]
+                    data = FileSerializer(rows, many=True, context={'request': request}).data
+                    return renderer.render({'results': data})
+
+                def fast_path():
+                    encode = make_file_row_encoder(request, storage)
+                    rows = File.objects.values(*FILE_LIST_FIELDS)[:page_size]
+                    return render_json({'results': [encode(row) for row in rows]})
+
+                slow = timed(serializer_path, options['repeat']) / page_size * 1e6
+                fast = timed(fast_path, options['repeat']) / page_size * 1e6
+                self.stdout.write(f"{page_size:>10} {slow:>18.2f} {fast:>12.2f} {slow / fast:>7.1f}x")
@@ -0,0 +1,49 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from files.phash import hamming, near_duplicate_clusters, near_duplicate_pairs
+from ._bench import timed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark near-duplicate search over synthetic 64-bit perceptual hashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=1_000_000)
+        parser.add_argument('--planted', type=int, default=1000,
+                            help='Near-duplicate copies planted with 1-3 flipped bits')
+        parser.add_argument('--threshold', type=int, default=10)
+        parser.add_argument('--report-threshold', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        count, planted = options['images'], options['planted']
+        hashes = rng.integers(0, 2 ** 64, size=count, dtype=np.uint64)
+        sources = rng.choice(count - planted, size=planted, replace=False)
+        flips = np.zeros(planted, dtype=np.uint64)
+        for _ in range(3):
+            flips |= np.uint64(1) << rng.integers(0, 64, size=planted, dtype=np.uint64)
+        hashes[count - planted:] = hashes[sources] ^ flips
+
+        target = int(hashes[-1])
+        scan = timed(lambda: np.flatnonzero(hamming(hashes, target) <= options['threshold']), options['repeat'])
+        self.stdout.write(
+            f"Vectorized scan, {count:,} hashes, threshold {options['threshold']}: {scan * 1000:.1f} ms/query"
+        )
+
+        result = {}
+
+        def report():
+            result['pairs'] = near_duplicate_pairs(hashes, options['report_threshold'])
+
+        elapsed = timed(report, 1)
+        self.stdout.write(
+            f"Multi-index pair search, threshold {options['report_threshold']}: {elapsed:.2f} s, "
+            f"{len(result['pairs'][0]):,} pairs found ({planted:,} planted)"
+        )
+
+        # Many uploads of one image: one run per block holding every copy
+        copies = hashes.copy()
+        copies[:options['planted']] = copies[0]
+        elapsed = timed(lambda: near_duplicate_clusters(copies, options['report_threshold']), 1)
+        self.stdout.write(f"Cluster report with {planted:,} identical copies: {elapsed:.2f} s")
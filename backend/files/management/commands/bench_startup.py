@@ -0,0 +1,112 @@
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROBE_PATH = '/api/files/?page_size=1'
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def get(url, timeout=5):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status
+    except OSError:
+        return None
+
+
+def memory(pid):
+    """RSS, PSS and private (unshared) memory of `pid` in MB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as listing:
+        return [int(child) for child in listing.read().split()]
+
+
+class Command(BaseCommand):
+    help = 'Boot the server the old and the new way; report time to first request and per-worker memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests sent after boot so every worker has served some')
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        manage = [sys.executable, 'manage.py']
+        with tempfile.TemporaryDirectory() as directory:
+            fingerprint = os.path.join(directory, 'migrations.fingerprint')
+            # Prime the fingerprint: the new path is measured on a steady-state reboot
+            subprocess.run([*manage, 'migrate_if_needed', '--fingerprint-file', fingerprint],
+                           cwd=settings.BASE_DIR, check=True, capture_output=True)
+            # Gunicorn reads ./gunicorn.conf.py unless told otherwise; the old boot had none
+            no_config = os.path.join(directory, 'gunicorn.conf.py')
+            open(no_config, 'w').close()
+            modes = {
+                # start.sh before: introspect and migrate on every boot, each worker imports the app
+                'before': (
+                    [[*manage, 'makemigrations', '--dry-run'], [*manage, 'migrate']],
+                    ['gunicorn', '-c', no_config, '-k', 'uvicorn_worker.UvicornWorker', '--workers', str(options['workers'])],
+                ),
+                'after': (
+                    [[*manage, 'migrate_if_needed', '--fingerprint-file', fingerprint]],
+                    ['gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(options['workers'])],
+                ),
+            }
+            self.stdout.write(
+                f"{'mode':>7} {'migrate s':>9} {'first request s':>15} {'RSS MB':>7} {'PSS MB':>7} {'private MB':>10}"
+            )
+            for mode, (setup, server) in modes.items():
+                results = [self.boot(setup, server, options) for _ in range(options['runs'])]
+                medians = [statistics.median(values) for values in zip(*results)]
+                self.stdout.write(
+                    f"{mode:>7} {medians[0]:>9.2f} {medians[1]:>15.2f} "
+                    f"{medians[2]:>7.1f} {medians[3]:>7.1f} {medians[4]:>10.1f}"
+                )
+
+    def boot(self, setup, server, options):
+        port = free_port()
+        url = f'http://127.0.0.1:{port}{PROBE_PATH}'
+        started = time.perf_counter()
+        for command in setup:
+            subprocess.run(command, cwd=settings.BASE_DIR, check=True, capture_output=True)
+        migrated = time.perf_counter() - started
+
+        process = subprocess.Popen(
+            [*server, '--bind', f'127.0.0.1:{port}', 'core.asgi:application'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while get(url, timeout=1) != 200:
+                if process.poll() is not None:
+                    raise RuntimeError(f'gunicorn exited with {process.returncode}')
+                time.sleep(0.01)
+            first_request = time.perf_counter() - started
+
+            for _ in range(options['requests']):
+                get(url)
+            workers = [memory(pid) for pid in children(process.pid)]
+            return (migrated, first_request, *(statistics.mean(column) for column in zip(*workers)))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from files.models import FileChange
+
+
+class Command(BaseCommand):
+    help = 'Compact the file change log: drop superseded events and purge old delete tombstones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=int, default=24,
+                            help='Collapse superseded events older than this')
+        parser.add_argument('--tombstone-days', type=int, default=30,
+                            help='Purge delete events older than this (clients behind must resync)')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        collapsed = FileChange.compact(now - timedelta(hours=options['older_than_hours']))
+        purged = FileChange.purge_tombstones(now - timedelta(days=options['tombstone_days']))
+        self.stdout.write(f'Collapsed {collapsed} superseded events, purged {purged} tombstones')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from files.models import File
+from files.phash import IMAGE_CONTENT_TYPES, dhash, perceptual_index
+
+
+class Command(BaseCommand):
+    help = 'Backfill perceptual hashes for images uploaded before they were computed at ingest'
+
+    def handle(self, *args, **options):
+        pending = File.objects.filter(file_type__in=IMAGE_CONTENT_TYPES, phash__isnull=True)
+        updated = 0
+        for instance in pending.iterator(chunk_size=500):
+            try:
+                with instance.file.open('rb') as source:
+                    phash = dhash(source)
+            except FileNotFoundError:
+                continue
+            if phash is not None:
+                File.objects.filter(id=instance.id).update(phash=phash)
+                updated += 1
+        if updated:
+            perceptual_index.bump_generation()
+        self.stdout.write(f'Computed {updated} perceptual hashes')
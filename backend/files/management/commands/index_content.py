@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from files.content_index import index_pending
+
+
+class Command(BaseCommand):
+    help = 'Extract and index the text of PDFs missing from the full-text index'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Indexed {index_pending()} PDFs')
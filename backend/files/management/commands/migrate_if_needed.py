@@ -0,0 +1,70 @@
+import hashlib
+import importlib.util
+import os
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+
+
+def migration_fingerprint(database='default'):
+    """
+    Digest of every installed app's migration files plus the identity of the
+    database file. It changes when a migration is added or edited, Django is
+    upgraded, or the database is replaced, without importing any migration
+    or querying the database.
+    """
+    digest = hashlib.sha256()
+    name = str(connections[database].settings_dict['NAME'])
+    digest.update(name.encode())
+    try:
+        stat = os.stat(name)
+        digest.update(f'{stat.st_dev}:{stat.st_ino}'.encode())
+    except OSError:
+        digest.update(b'missing')
+
+    for app_config in sorted(apps.get_app_configs(), key=lambda config: config.label):
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        try:
+            spec = importlib.util.find_spec(module_name) if module_name else None
+        except ModuleNotFoundError:
+            spec = None
+        for directory in (spec.submodule_search_locations or []) if spec else []:
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.py'):
+                    digest.update(f'{app_config.label}/{filename}'.encode())
+                    with open(os.path.join(directory, filename), 'rb') as source:
+                        digest.update(source.read())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Run migrate only if migration files or the database changed since the last successful run'
+    # System checks import the URLconf and every view; migrate runs them when it is needed
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fingerprint-file', default=settings.MIGRATION_FINGERPRINT_FILE,
+                            help='Where the fingerprint of the last applied state is kept')
+
+    def handle(self, *args, **options):
+        path = options['fingerprint_file']
+        fingerprint = migration_fingerprint()
+        try:
+            with open(path) as cached:
+                if cached.read().strip() == fingerprint:
+                    self.stdout.write('Migrations unchanged since the last run; skipping migrate')
+                    return
+        except OSError:
+            pass
+
+        call_command('migrate', interactive=False, verbosity=options['verbosity'], skip_checks=False)
+        # The database file may have just been created
+        fingerprint = migration_fingerprint()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f'{path}.tmp', 'w') as pending:
+            pending.write(fingerprint)
+        os.replace(f'{path}.tmp', path)
+        self.stdout.write('Migrations applied; fingerprint saved')
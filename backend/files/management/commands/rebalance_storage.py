@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from files.storage import VolumeStorage
+
+
+class Command(BaseCommand):
+    help = 'Move blobs onto the storage volume that owns them after STORAGE_VOLUMES changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the moves')
+        parser.add_argument('--max-mb-per-second', type=float, default=None,
+                            help='Throttle copying to leave I/O for live traffic')
+
+    def handle(self, *args, **options):
+        limit = options['max_mb_per_second']
+        moved, moved_bytes = VolumeStorage().rebalance(
+            dry_run=options['dry_run'],
+            max_bytes_per_second=limit * 1024 * 1024 if limit else None,
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(f'{verb} {moved} blobs ({moved_bytes / (1024 * 1024):.2f} MB)')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from files.models import FileFacet
+
+
+class Command(BaseCommand):
+    help = 'Recompute the facet rollups from the File table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            FileFacet.rebuild()
+        self.stdout.write(f'Rebuilt {FileFacet.objects.count()} facet rows')
@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from files.history import downsample
+
+
+class Command(BaseCommand):
+    help = 'Roll per-minute storage history into hourly and daily rows and apply retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minute-retention-hours', type=int, default=48,
+                            help='Keep per-minute rows this long')
+        parser.add_argument('--hour-retention-days', type=int, default=90,
+                            help='Keep hourly rows this long')
+        parser.add_argument('--day-retention-days', type=int, default=0,
+                            help='Keep daily rows this long (0 keeps them forever)')
+
+    def handle(self, *args, **options):
+        result = downsample(
+            timezone.now(),
+            minute_retention=timedelta(hours=options['minute_retention_hours']),
+            hour_retention=timedelta(days=options['hour_retention_days']),
+            day_retention=timedelta(days=options['day_retention_days']) if options['day_retention_days'] else None,
+        )
+        self.stdout.write(
+            f"Rolled up {result['hours']} hours and {result['days']} days, purged {result['purged']} rows"
+        )
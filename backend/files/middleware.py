@@ -0,0 +1,71 @@
+import asyncio
+from django.http import HttpResponse
+from .admission import (
+    ADMITTED_SCOPE_KEY, BUSY_BODY, classify, declared_size, get_limiter,
+)
+
+
+def busy_response(limiter):
+    response = HttpResponse(BUSY_BODY, status=503, content_type='application/json')
+    response['Retry-After'] = str(limiter.retry_after)
+    return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Cap in-flight uploads (count and declared bytes) and reads separately,
+    answering 503 with Retry-After when a budget and its wait queue are full.
+    Django reads upload bodies lazily under WSGI, so this runs before the
+    body is consumed. Under ASGI the body is buffered before any middleware,
+    so uploads are admitted earlier by `admission_asgi` and skipped here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        budget = classify(request.method, request.path)
+        if budget is None or getattr(request, 'scope', {}).get(ADMITTED_SCOPE_KEY):
+            return self.get_response(request)
+
+        limiter = get_limiter(budget)
+        cost = declared_size(request.META.get('CONTENT_LENGTH')) if budget == 'uploads' else 0
+        if not limiter.acquire(cost):
+            return busy_response(limiter)
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release(cost)
+
+
+def admission_asgi(app):
+    """
+    Wrap an ASGI app so uploads are admitted or shed from their headers,
+    before Django buffers the request body.
+    """
+
+    async def wrapper(scope, receive, send):
+        if scope['type'] != 'http' or classify(scope['method'], scope['path']) != 'uploads':
+            await app(scope, receive, send)
+            return
+
+        limiter = get_limiter('uploads')
+        cost = declared_size(dict(scope.get('headers', [])).get(b'content-length'))
+        admitted = limiter.try_acquire(cost) or await asyncio.to_thread(limiter.acquire, cost)
+        if not admitted:
+            await send({
+                'type': 'http.response.start',
+                'status': 503,
+                'headers': [
+                    (b'content-type', b'application/json'),
+                    (b'retry-after', str(limiter.retry_after).encode()),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': BUSY_BODY})
+            return
+        try:
+            await app({**scope, ADMITTED_SCOPE_KEY: True}, receive, send)
+        finally:
+            limiter.release(cost)
+
+    return wrapper
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0006_alter_file_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event', models.CharField(choices=[('created', 'Created'), ('referenced', 'Referenced'), ('deleted', 'Deleted')], max_length=16)),
+                ('file_id', models.UUIDField(db_index=True)),
+                ('hash', models.CharField(max_length=64)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('file_type', models.CharField(max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('reference_count', models.BigIntegerField()),
+                ('occurred_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='storagemetadata',
+            name='change_log_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0007_filechange_storagemetadata_change_log_floor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='phash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
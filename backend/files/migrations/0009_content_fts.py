@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0008_file_phash'),
+    ]
+
+    operations = [
+        # Full-text index of PDF contents, one row per blob hash (see files/content_index.py)
+        migrations.RunSQL(
+            sql="CREATE VIRTUAL TABLE files_content_fts USING fts5(hash UNINDEXED, body, tokenize='porter unicode61')",
+            reverse_sql="DROP TABLE files_content_fts",
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_facets(apps, schema_editor):
+    File = apps.get_model('files', 'File')
+    FileFacet = apps.get_model('files', 'FileFacet')
+    totals = {}
+    for file in File.objects.only('file_type', 'size', 'uploaded_at').iterator(chunk_size=2000):
+        for key in [
+            ('file_type', file.file_type),
+            ('size_bucket', str(int(file.size).bit_length())),
+            ('upload_day', timezone.localdate(file.uploaded_at).isoformat()),
+        ]:
+            count, size = totals.get(key, (0, 0))
+            totals[key] = (count + 1, size + file.size)
+    FileFacet.objects.bulk_create([
+        FileFacet(dimension=dimension, value=value, count=count, bytes=size)
+        for (dimension, value), (count, size) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0009_content_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('file_type', 'File type'), ('size_bucket', 'Size bucket'), ('upload_day', 'Upload day')], max_length=16)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='filefacet',
+            constraint=models.UniqueConstraint(fields=('dimension', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0010_filefacet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('files_referenced', models.BigIntegerField(default=0)),
+                ('unique_files_stored', models.BigIntegerField(default=0)),
+                ('duplicates_prevented', models.BigIntegerField(default=0)),
+                ('storage_saved_bytes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='storagemetadata',
+            name='history_days_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='storagemetadata',
+            name='history_hours_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='storagehistory',
+            constraint=models.UniqueConstraint(fields=('resolution', 'bucket'), name='unique_history_bucket'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0011_storagehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storagemetadata',
+            name='phash_generation',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from datetime import timedelta, timezone as dt_timezone
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import uuid
 import os
@@ -20,6 +22,8 @@ class File(models.Model):
     size = models.BigIntegerField(null=False, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True,null=False, db_index=True)
     reference_count = models.BigIntegerField(default=1,null=False)
+    # 64-bit perceptual (difference) hash for images, stored signed; see files/phash.py
+    phash = models.BigIntegerField(null=True, blank=True)
     
     class Meta:
         ordering = ['-uploaded_at']
@@ -71,6 +75,13 @@ class StorageMetadata(models.Model):
     duplicates_prevented = models.IntegerField(default=0)
     # storage_saved_bytes = models.BigIntegerField(default=0)
     storage_saved_mb = models.FloatField(default=0)
+    # Lowest FileChange cursor still replayable after tombstones were purged
+    change_log_floor = models.BigIntegerField(default=0)
+    # StorageHistory buckets before these instants are rolled up into hour / day rows
+    history_hours_until = models.DateTimeField(null=True, blank=True)
+    history_days_until = models.DateTimeField(null=True, blank=True)
+    # Bumped by phash backfills so every process reloads its perceptual index
+    phash_generation = models.BigIntegerField(default=0)
 
     class Meta:
         # Ensure only one row exists
@@ -81,4 +92,183 @@ class StorageMetadata(models.Model):
     @classmethod
     def get_instance(cls):
         obj, _ = cls.objects.get_or_create(id=1)
-        return obj
\ No newline at end of file
+        return obj
+
+class FileChange(models.Model):
+    """
+    Append-only log of File changes, used as a cursor-based change feed.
+    Each event carries a full snapshot of the file so superseded events can
+    be compacted away without breaking clients replaying from any cursor.
+    """
+    CREATED = 'created'
+    REFERENCED = 'referenced'
+    DELETED = 'deleted'
+    EVENT_CHOICES = [
+        (CREATED, 'Created'),
+        (REFERENCED, 'Referenced'),
+        (DELETED, 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    event = models.CharField(max_length=16, choices=EVENT_CHOICES, null=False)
+    file_id = models.UUIDField(null=False, db_index=True)
+    hash = models.CharField(max_length=64, null=False)
+    original_filename = models.CharField(max_length=255, null=False)
+    file_type = models.CharField(max_length=100, null=False)
+    size = models.BigIntegerField(null=False)
+    reference_count = models.BigIntegerField(null=False)
+    occurred_at = models.DateTimeField(auto_now_add=True, null=False, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    @classmethod
+    def record(cls, event, file):
+        """Append an event for `file`; call inside the transaction changing it"""
+        return cls.objects.create(
+            event=event,
+            file_id=file.id,
+            hash=file.hash,
+            original_filename=file.original_filename,
+            file_type=file.file_type,
+            size=file.size,
+            reference_count=file.reference_count,
+        )
+
+    @classmethod
+    def compact(cls, before):
+        """Drop events older than `before` that a later event for the same file supersedes"""
+        superseded = cls.objects.filter(file_id=models.OuterRef('file_id'), id__gt=models.OuterRef('id'))
+        deleted, _ = cls.objects.filter(occurred_at__lt=before).filter(models.Exists(superseded)).delete()
+        return deleted
+
+    @classmethod
+    def purge_tombstones(cls, before):
+        """
+        Drop delete events older than `before`. Cursors below the newest purged
+        event can no longer see those deletes, so the floor is raised past it
+        in the same transaction; a reader never sees the tombstones gone while
+        the old floor still admits its cursor.
+        """
+        with transaction.atomic():
+            tombstones = cls.objects.filter(event=cls.DELETED, occurred_at__lt=before)
+            newest = tombstones.aggregate(newest=models.Max('id'))['newest']
+            if newest is None:
+                return 0
+            deleted, _ = tombstones.filter(id__lte=newest).delete()
+            metadata = StorageMetadata.get_instance()
+            metadata.change_log_floor = max(metadata.change_log_floor, newest)
+            metadata.save(update_fields=['change_log_floor'])
+            return deleted
+
+def size_bucket(size):
+    """Log2 size bucket: bucket b holds sizes in [2**(b-1), 2**b), bucket 0 holds empty files"""
+    return int(size).bit_length()
+
+class FileFacet(models.Model):
+    """
+    Rollup of File counts and bytes per facet value, maintained on create and
+    destroy so the unfiltered facet view never scans the File table.
+    """
+    FILE_TYPE = 'file_type'
+    SIZE_BUCKET = 'size_bucket'
+    UPLOAD_DAY = 'upload_day'
+    DIMENSION_CHOICES = [
+        (FILE_TYPE, 'File type'),
+        (SIZE_BUCKET, 'Size bucket'),
+        (UPLOAD_DAY, 'Upload day'),
+    ]
+
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES, null=False)
+    value = models.CharField(max_length=100, null=False)
+    count = models.BigIntegerField(default=0, null=False)
+    bytes = models.BigIntegerField(default=0, null=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='unique_facet_value')
+        ]
+
+    @staticmethod
+    def keys_for(file):
+        return [
+            (FileFacet.FILE_TYPE, file.file_type),
+            (FileFacet.SIZE_BUCKET, str(size_bucket(file.size))),
+            (FileFacet.UPLOAD_DAY, timezone.localdate(file.uploaded_at).isoformat()),
+        ]
+
+    @classmethod
+    def apply(cls, file, delta):
+        """Add (delta=1) or remove (delta=-1) `file` from the rollups; call inside its transaction"""
+        for dimension, value in cls.keys_for(file):
+            cls.objects.get_or_create(dimension=dimension, value=value)
+            cls.objects.filter(dimension=dimension, value=value).update(
+                count=models.F('count') + delta,
+                bytes=models.F('bytes') + delta * file.size,
+            )
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every rollup from the File table"""
+        cls.objects.all().delete()
+        totals = {}
+        for file in File.objects.only('file_type', 'size', 'uploaded_at').iterator(chunk_size=2000):
+            for key in cls.keys_for(file):
+                count, size = totals.get(key, (0, 0))
+                totals[key] = (count + 1, size + file.size)
+        cls.objects.bulk_create([
+            cls(dimension=dimension, value=value, count=count, bytes=size)
+            for (dimension, value), (count, size) in totals.items()
+        ], batch_size=1000)
+
+class StorageHistory(models.Model):
+    """
+    Changes to the StorageMetadata totals per time bucket. Uploads and deletes
+    add to the current minute's row; files/history.py rolls complete minutes
+    into hour rows and complete hours into day rows. Buckets are UTC.
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    RESOLUTION_CHOICES = [
+        (MINUTE, 'Minute'),
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+    STEPS = {
+        MINUTE: timedelta(minutes=1),
+        HOUR: timedelta(hours=1),
+        DAY: timedelta(days=1),
+    }
+    VALUE_FIELDS = ['files_referenced', 'unique_files_stored', 'duplicates_prevented', 'storage_saved_bytes']
+
+    resolution = models.CharField(max_length=8, choices=RESOLUTION_CHOICES, null=False)
+    bucket = models.DateTimeField(null=False)
+    files_referenced = models.BigIntegerField(default=0, null=False)
+    unique_files_stored = models.BigIntegerField(default=0, null=False)
+    duplicates_prevented = models.BigIntegerField(default=0, null=False)
+    storage_saved_bytes = models.BigIntegerField(default=0, null=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resolution', 'bucket'], name='unique_history_bucket')
+        ]
+
+    @classmethod
+    def truncate(cls, moment, resolution):
+        """Start of the `resolution` bucket containing `moment`"""
+        moment = moment.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+        if resolution in (cls.HOUR, cls.DAY):
+            moment = moment.replace(minute=0)
+        if resolution == cls.DAY:
+            moment = moment.replace(hour=0)
+        return moment
+
+    @classmethod
+    def record(cls, **deltas):
+        """Add `deltas` (VALUE_FIELDS) to the current minute; call inside the transaction making the change"""
+        bucket = cls.truncate(timezone.now(), cls.MINUTE)
+        cls.objects.get_or_create(resolution=cls.MINUTE, bucket=bucket)
+        cls.objects.filter(resolution=cls.MINUTE, bucket=bucket).update(**{
+            field: models.F(field) + delta for field, delta in deltas.items()
+        })
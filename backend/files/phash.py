@@ -0,0 +1,271 @@
+import threading
+import numpy as np
+from django.db.models import F, Max
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is optional at runtime
+    Image = None
+
+# Content types we compute perceptual hashes for
+IMAGE_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/jpg'}
+
+DEFAULT_THRESHOLD = 10
+MAX_THRESHOLD = 32
+# The cluster report splits hashes into threshold + 1 blocks; small blocks
+# collide a lot, so it is limited to tighter thresholds than single lookups
+REPORT_DEFAULT_THRESHOLD = 4
+REPORT_MAX_THRESHOLD = 8
+# Neighbours each hash is compared with inside one block run of the report
+REPORT_MAX_RUN_OFFSET = 256
+
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def dhash(fileobj, hash_size=8):
+    """
+    Difference hash of an image: shrink to (hash_size + 1) x hash_size
+    grayscale and record whether each pixel is brighter than its right
+    neighbour. Re-encoded or resized copies land within a few bits.
+    Returns a signed 64-bit int (what BigIntegerField stores), or None if
+    the image can't be decoded.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(fileobj) as image:
+            image.draft('L', (hash_size * 4, hash_size * 4))  # Cheap JPEG downscale on decode
+            pixels = np.asarray(
+                image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS),
+                dtype=np.int16,
+            )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        fileobj.seek(0)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int(np.packbits(bits).view('>u8')[0])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def popcount(values):
+    """Number of set bits in each element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def hamming(hashes, target):
+    """Hamming distance from `target` to every hash in a uint64 array"""
+    return popcount(np.bitwise_xor(hashes, np.uint64(target & 0xFFFFFFFFFFFFFFFF)))
+
+
+def _close_pairs(hashes, threshold, blocks=None, max_offset=None):
+    """
+    Yield (left, right) index arrays of pairs within `threshold` bits, via
+    multi-index hashing: split the 64 bits into threshold + 1 blocks. Two
+    hashes within the threshold must agree exactly on at least one block
+    (pigeonhole), so only rows sharing a block value are compared. A pair
+    may come up once per block it agrees on. With `max_offset`, each row is
+    only compared with that many neighbours in its run (sorted by the full
+    hash), which bounds the cost of very long runs.
+    """
+    blocks = blocks or min(threshold + 1, 64)
+    bounds = np.linspace(0, 64, blocks + 1).astype(np.uint64)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        mask = np.uint64((1 << int(stop - start)) - 1)
+        keys = (hashes >> start) & mask
+        order = np.lexsort((hashes, keys))
+        sorted_keys = keys[order]
+        # Rows with equal keys are adjacent; walk each run pairing rows `offset` apart.
+        # Only positions that still matched at the previous offset can match again.
+        positions = np.arange(len(sorted_keys))
+        offset = 1
+        while len(positions) and (max_offset is None or offset <= max_offset):
+            positions = positions[positions + offset < len(sorted_keys)]
+            positions = positions[sorted_keys[positions] == sorted_keys[positions + offset]]
+            left, right = order[positions], order[positions + offset]
+            close = popcount(hashes[left] ^ hashes[right]) <= threshold
+            yield np.minimum(left[close], right[close]), np.maximum(left[close], right[close])
+            offset += 1
+
+
+def near_duplicate_pairs(hashes, threshold, blocks=None):
+    """
+    All index pairs (i, j), i < j, within `threshold` bits.
+    Returns (left, right, distance) arrays.
+    """
+    found_left, found_right = [np.array([], dtype=np.int64)], [np.array([], dtype=np.int64)]
+    for left, right in _close_pairs(hashes, threshold, blocks):
+        found_left.append(left)
+        found_right.append(right)
+    pairs = np.stack([np.concatenate(found_left), np.concatenate(found_right)], axis=1).astype(np.int64)
+    if len(pairs):
+        pairs = np.unique(pairs, axis=0)
+    left, right = pairs[:, 0], pairs[:, 1]
+    return left, right, popcount(hashes[left] ^ hashes[right])
+
+
+def _find(labels, nodes):
+    """Root of each node, compressing the paths of the nodes asked about"""
+    roots = labels[nodes]
+    while not np.array_equal(parents := labels[roots], roots):
+        roots = parents
+    labels[nodes] = roots
+    return roots
+
+
+def _union(labels, left, right):
+    """Vectorized union-find: merge the components of each (left, right) pair"""
+    while len(left):
+        a, b = _find(labels, left), _find(labels, right)
+        differ = a != b
+        left, right, a, b = left[differ], right[differ], a[differ], b[differ]
+        # Hook the larger root under the smaller; pairs whose hook lost to another are retried
+        np.minimum.at(labels, np.maximum(a, b), np.minimum(a, b))
+
+
+def near_duplicate_clusters(hashes, threshold, max_offset=REPORT_MAX_RUN_OFFSET):
+    """
+    Label each hash with the smallest index in its near-duplicate cluster.
+    Equal hashes are collapsed first, so a thousand copies of one image are
+    one row rather than half a million pairs, and matched pairs are merged
+    as each block is scanned instead of being collected first.
+    """
+    distinct, inverse = np.unique(hashes, return_inverse=True)
+    labels = np.arange(len(distinct))
+    for left, right in _close_pairs(distinct, threshold, max_offset=max_offset):
+        _union(labels, left, right)
+    labels = _find(labels, np.arange(len(distinct)))
+    # Relabel each cluster by its first row in `hashes`
+    first = np.full(len(distinct), len(hashes))
+    np.minimum.at(first, labels[inverse.reshape(-1)], np.arange(len(hashes)))
+    return first[labels][inverse.reshape(-1)]
+
+
+def reclaimable_report(ids, hashes, sizes, threshold):
+    """
+    Group images into near-duplicate clusters and estimate the bytes freed by
+    keeping only the largest copy in each.
+    """
+    labels = near_duplicate_clusters(hashes, threshold)
+    clusters = {}
+    for row in np.flatnonzero(np.bincount(labels, minlength=len(labels))[labels] > 1).tolist():
+        clusters.setdefault(int(labels[row]), []).append(row)
+    report = []
+    for members in clusters.values():
+        members = sorted(members, key=lambda row: (-sizes[row], str(ids[row])))
+        report.append({
+            'keep': ids[members[0]],
+            'duplicates': [ids[row] for row in members[1:]],
+            'reclaimable_bytes': int(sum(sizes[row] for row in members[1:])),
+        })
+    report.sort(key=lambda cluster: -cluster['reclaimable_bytes'])
+    return {'clusters': report, 'reclaimable_bytes': sum(cluster['reclaimable_bytes'] for cluster in report)}
+
+
+class PhashSnapshot:
+    """
+    Immutable (id, size, phash) arrays for all hashed images at one point of
+    the change feed. Refreshes build a new snapshot instead of editing this
+    one, so lookups on other threads always see matching arrays.
+    """
+
+    def __init__(self, ids, sizes, hashes):
+        for array in (ids, sizes, hashes):
+            array.flags.writeable = False
+        self.ids, self.sizes, self.hashes = ids, sizes, hashes
+        self._reports = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        return cls(
+            np.array([row[0] for row in rows], dtype=object),
+            np.array([row[1] for row in rows], dtype=np.int64),
+            np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64),
+        )
+
+    def with_delta(self, touched, rows):
+        """New snapshot without the rows for `touched` file ids, plus their current `rows`"""
+        position = {file_id: index for index, file_id in enumerate(self.ids.tolist())}
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[[position[file_id] for file_id in touched if file_id in position]] = False
+        added = PhashSnapshot.from_rows(rows)
+        return PhashSnapshot(
+            np.concatenate([self.ids[keep], added.ids]),
+            np.concatenate([self.sizes[keep], added.sizes]),
+            np.concatenate([self.hashes[keep], added.hashes]),
+        )
+
+    def similar(self, phash, threshold, exclude=None):
+        """(id, distance) pairs within `threshold`, closest first, via a vectorized scan"""
+        distances = hamming(self.hashes, phash)
+        matches = np.flatnonzero(distances <= threshold)
+        matches = matches[np.argsort(distances[matches], kind='stable')]
+        return [(self.ids[row], int(distances[row])) for row in matches.tolist() if self.ids[row] != exclude]
+
+    def report(self, threshold):
+        """Cluster report, memoized for the lifetime of this snapshot"""
+        if threshold not in self._reports:
+            self._reports[threshold] = reclaimable_report(
+                self.ids.tolist(), self.hashes, self.sizes.tolist(), threshold
+            )
+        return dict(self._reports[threshold])
+
+
+class PerceptualIndex:
+    """
+    Process-local, in-memory copy of (id, size, phash) for all hashed images.
+    Kept current by replaying the FileChange feed since the last load, so a
+    query after an upload costs one small delta query instead of a reload.
+    `refresh()` returns the current PhashSnapshot to query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._generation = None
+        self._snapshot = PhashSnapshot.from_rows([])
+
+    def refresh(self):
+        from .models import File, FileChange, StorageMetadata
+        with self._lock:
+            latest = FileChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+            metadata = StorageMetadata.get_instance()
+            if latest == self._cursor and metadata.phash_generation == self._generation:
+                return self._snapshot
+            images = File.objects.filter(phash__isnull=False).values_list('id', 'size', 'phash')
+            if (
+                self._cursor is None or self._cursor < metadata.change_log_floor
+                or metadata.phash_generation != self._generation
+            ):
+                self._snapshot = PhashSnapshot.from_rows(images)
+            else:
+                touched = set(
+                    FileChange.objects.filter(id__gt=self._cursor, id__lte=latest)
+                    .values_list('file_id', flat=True)
+                )
+                self._snapshot = self._snapshot.with_delta(touched, images.filter(id__in=touched))
+            self._cursor = latest
+            self._generation = metadata.phash_generation
+            return self._snapshot
+
+    def invalidate(self):
+        """Force a full reload of this process's index on next refresh"""
+        with self._lock:
+            self._cursor = None
+
+    @staticmethod
+    def bump_generation():
+        """
+        Make every process reload its index on next refresh. Backfills change
+        hashes without appending to the change feed, so the deltas the other
+        processes replay would never include them.
+        """
+        from .models import StorageMetadata
+        StorageMetadata.get_instance()
+        StorageMetadata.objects.filter(id=1).update(phash_generation=F('phash_generation') + 1)
+
+
+perceptual_index = PerceptualIndex()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import File, StorageMetadata
+from .models import File, FileChange, StorageMetadata
 
 class FileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,3 +17,19 @@ class StorageMetadataSerializer(serializers.ModelSerializer):
             'duplicates_prevented',
             'storage_saved_mb',
         ]
+
+class FileChangeSerializer(serializers.ModelSerializer):
+    cursor = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = FileChange
+        fields = [
+            'cursor',
+            'event',
+            'file_id',
+            'original_filename',
+            'file_type',
+            'size',
+            'reference_count',
+            'occurred_at',
+        ]
@@ -0,0 +1,212 @@
+import bisect
+import contextlib
+import hashlib
+import os
+import shutil
+import time
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+
+VIRTUAL_NODES_PER_WEIGHT = 64
+
+
+def parse_volumes(value):
+    """Parse `name=path:weight,...` (as in the STORAGE_VOLUMES env var)"""
+    volumes = []
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        name, _, rest = entry.partition('=')
+        path, _, weight = rest.rpartition(':') if ':' in rest else (rest, '', '1')
+        volumes.append({'name': name, 'path': path, 'weight': int(weight)})
+    return volumes
+
+
+def placement_key(name):
+    """
+    Ring key for a blob: a hash of its name. Blob names are random UUIDs
+    (see file_upload_path), so keys spread evenly while the names stay
+    opaque; the content hash never appears in a media URL.
+    """
+    return int(hashlib.sha256(name.encode()).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Weighted consistent-hash ring; volumes with weight 0 own nothing"""
+
+    def __init__(self, volumes):
+        points = []
+        for volume in volumes:
+            for replica in range(volume['weight'] * VIRTUAL_NODES_PER_WEIGHT):
+                digest = hashlib.sha256(f"{volume['name']}#{replica}".encode()).hexdigest()
+                points.append((int(digest[:16], 16), volume['name']))
+        if not points:
+            raise ValueError('At least one storage volume needs a positive weight')
+        points.sort()
+        self._keys = [point for point, _ in points]
+        self._owners = [owner for _, owner in points]
+
+    def owner(self, key):
+        index = bisect.bisect(self._keys, key) % len(self._keys)
+        return self._owners[index]
+
+
+@deconstructible
+class VolumeStorage(Storage):
+    """
+    Spreads blobs over several root directories (`STORAGE_VOLUMES`) by
+    consistent hashing of their names, so adding or removing a volume
+    only relocates the blobs whose ring owner changed.
+
+    Writes go to the owning volume. Reads look there first and then fall back
+    to the other volumes, so blobs not yet moved by the rebalancer stay
+    readable. A volume with weight 0 is draining: still read, never written.
+    Nothing is shared between calls, so reads can run in parallel.
+    """
+
+    def __init__(self, volumes=None, base_url=None):
+        self.volumes = volumes or settings.STORAGE_VOLUMES
+        self.base_url = base_url if base_url is not None else settings.MEDIA_URL
+        self.ring = HashRing(self.volumes)
+        self._storages = {
+            volume['name']: FileSystemStorage(location=volume['path'], base_url=self.base_url)
+            for volume in self.volumes
+        }
+        self._url_storage = next(iter(self._storages.values()))
+
+    def owner(self, name):
+        return self.ring.owner(placement_key(name))
+
+    def _candidates(self, name):
+        owner = self.owner(name)
+        yield owner, self._storages[owner]
+        for volume_name, storage in self._storages.items():
+            if volume_name != owner:
+                yield volume_name, storage
+
+    def locate(self, name):
+        """(volume name, storage) currently holding `name`, or (None, None)"""
+        for volume_name, storage in self._candidates(name):
+            if storage.exists(name):
+                return volume_name, storage
+        return None, None
+
+    def _located(self, name):
+        _, storage = self.locate(name)
+        if storage is None:
+            raise FileNotFoundError(f'{name} is not on any storage volume')
+        return storage
+
+    def _open(self, name, mode='rb'):
+        return self._located(name).open(name, mode)
+
+    def _save(self, name, content):
+        return self._storages[self.owner(name)].save(name, content)
+
+    def delete(self, name):
+        for _, storage in self._candidates(name):
+            storage.delete(name)
+
+    def exists(self, name):
+        return self.locate(name)[1] is not None
+
+    def listdir(self, path):
+        directories, files = set(), set()
+        for storage in self._storages.values():
+            if storage.exists(path):
+                found_directories, found_files = storage.listdir(path)
+                directories.update(found_directories)
+                files.update(found_files)
+        return sorted(directories), sorted(files)
+
+    def path(self, name):
+        _, storage = self.locate(name)
+        return (storage or self._storages[self.owner(name)]).path(name)
+
+    def size(self, name):
+        return self._located(name).size(name)
+
+    def url(self, name):
+        return self._url_storage.url(name)
+
+    def get_accessed_time(self, name):
+        return self._located(name).get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self._located(name).get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self._located(name).get_modified_time(name)
+
+    def iter_blobs(self):
+        """Yield (volume name, blob name) for every file on every volume"""
+        for volume in self.volumes:
+            root = volume['path']
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.endswith('.rebalance'):
+                        continue
+                    relative = os.path.relpath(os.path.join(directory, filename), root)
+                    yield volume['name'], relative.replace(os.sep, '/')
+
+    @staticmethod
+    def _move(source, target):
+        """
+        Copy `source` to a temporary name, fsync it and link it into place
+        without replacing an existing copy, then remove the source. If the
+        source is deleted meanwhile, the copy made here is removed again and
+        FileNotFoundError raised.
+        """
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = target + '.rebalance'
+        linked = False
+        try:
+            with open(source, 'rb') as reader, open(temporary, 'wb') as writer:
+                shutil.copyfileobj(reader, writer)
+                writer.flush()
+                os.fsync(writer.fileno())
+            try:
+                os.link(temporary, target)
+                linked = True
+            except FileExistsError:
+                pass  # The owner already has a complete copy
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            if linked:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(target)
+            raise
+
+    def rebalance(self, dry_run=False, max_bytes_per_second=None, log=None):
+        """
+        Move every blob that is not on its ring owner. A blob is copied and
+        fsynced under a temporary name and linked into place before the
+        source is removed, so concurrent readers always find a complete copy.
+        Blobs deleted while being moved are skipped.
+        Returns (moved count, moved bytes).
+        """
+        moved = moved_bytes = 0
+        for volume_name, name in list(self.iter_blobs()):
+            owner = self.owner(name)
+            if owner == volume_name:
+                continue
+            source = self._storages[volume_name].path(name)
+            target = self._storages[owner].path(name)
+            try:
+                size = os.path.getsize(source)
+                if log:
+                    log(f'{name}: {volume_name} -> {owner} ({size} bytes)')
+                if not dry_run:
+                    self._move(source, target)
+            except FileNotFoundError:
+                if log:
+                    log(f'{name}: deleted during rebalance, skipped')
+                continue
+            if not dry_run and max_bytes_per_second:
+                time.sleep(size / max_bytes_per_second)
+            moved += 1
+            moved_bytes += size
+        return moved, moved_bytes
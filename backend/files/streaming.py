@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+async def iterate_in_thread(iterable):
+    """
+    Async iterator over a blocking iterable. Each step runs in the request's
+    thread-sensitive executor, so the database cursor and open files are
+    used from one thread while the event loop keeps sending chunks.
+    """
+    iterator = iter(iterable)
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await step(iterator, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        if close := getattr(iterator, 'close', None):
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_response(request, content, **kwargs):
+    """
+    StreamingHttpResponse for a blocking iterable that streams under both
+    handlers. The ASGI handler reads sync iterators into a list before
+    sending anything, so ASGI requests (which carry a `scope`) get the
+    iterable wrapped in `iterate_in_thread`.
+    """
+    if hasattr(request, 'scope'):
+        content = iterate_in_thread(content)
+    return StreamingHttpResponse(content, **kwargs)
@@ -0,0 +1,116 @@
+import threading
+from asgiref.sync import async_to_sync
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.test import SimpleTestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files.admission import Limiter, get_limiter, reset_limiters
+from files.middleware import admission_asgi
+from files.models import StorageMetadata
+
+FULL = {'max_concurrent': 0, 'max_queue': 0, 'retry_after': 7}
+OPEN = {'max_concurrent': 10, 'max_bytes': 10 * 1024 * 1024, 'max_queue': 0}
+
+class LimiterTests(SimpleTestCase):
+    def test_concurrency_and_byte_caps(self):
+        """Test both the in-flight count and byte budgets"""
+        limiter = Limiter(max_concurrent=2, max_bytes=100)
+        self.assertTrue(limiter.try_acquire(60))
+        self.assertFalse(limiter.try_acquire(60))
+        self.assertTrue(limiter.try_acquire(40))
+        self.assertFalse(limiter.try_acquire(0))
+        limiter.release(60)
+        # Oversized bodies are capped at the budget and run alone
+        limiter.release(40)
+        self.assertTrue(limiter.try_acquire(1000))
+        self.assertEqual(limiter.stats()['in_flight_bytes'], 100)
+
+    def test_bounded_queue(self):
+        """Test waiters are admitted on release and overflow is shed at once"""
+        limiter = Limiter(max_concurrent=1, max_queue=1, queue_timeout=5)
+        self.assertTrue(limiter.acquire())
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        waiter.start()
+        while limiter.stats()['waiting'] == 0:
+            pass
+        self.assertFalse(limiter.acquire())  # queue is full
+        limiter.release()
+        waiter.join()
+        self.assertEqual(results, [True])
+        self.assertEqual(limiter.stats()['rejected'], 1)
+
+    def test_queue_timeout(self):
+        limiter = Limiter(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        limiter.acquire()
+        self.assertFalse(limiter.acquire())
+
+
+class AdmissionMiddlewareTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        reset_limiters()
+        self.addCleanup(reset_limiters)
+
+    def upload(self):
+        return self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile("a.pdf", b'content', content_type="application/pdf")},
+            format='multipart'
+        )
+
+    @override_settings(ADMISSION_CONTROL={'uploads': FULL, 'reads': OPEN})
+    def test_uploads_shed_while_reads_continue(self):
+        """Test a full upload budget returns 503 without affecting listings"""
+        response = self.upload()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(self.client.get('/api/files/').status_code, status.HTTP_200_OK)
+        self.assertEqual(get_limiter('reads').stats()['in_flight'], 0)
+
+    @override_settings(ADMISSION_CONTROL={'uploads': OPEN, 'reads': FULL})
+    def test_reads_have_their_own_budget(self):
+        self.assertEqual(self.upload().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get('/api/files/').status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(get_limiter('uploads').stats()['in_flight'], 0)
+
+
+class AdmissionAsgiTests(SimpleTestCase):
+    def setUp(self):
+        reset_limiters()
+        self.addCleanup(reset_limiters)
+
+    def call(self, method, path, headers=()):
+        calls, sent = [], []
+
+        async def app(scope, receive, send):
+            calls.append(scope)
+
+        async def receive():
+            raise AssertionError('body must not be read')
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'headers': list(headers)}
+        async_to_sync(admission_asgi(app))(scope, receive, send)
+        return calls, sent
+
+    @override_settings(ADMISSION_CONTROL={'uploads': FULL, 'reads': OPEN})
+    def test_upload_shed_before_body(self):
+        """Test overloaded uploads get 503 from headers alone"""
+        calls, sent = self.call('POST', '/api/files/', [(b'content-length', b'2048')])
+        self.assertEqual(calls, [])
+        self.assertEqual(sent[0]['status'], 503)
+        self.assertIn((b'retry-after', b'7'), sent[0]['headers'])
+        # Other requests pass straight through
+        calls, _ = self.call('GET', '/api/files/')
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(ADMISSION_CONTROL={'uploads': OPEN, 'reads': OPEN})
+    def test_admitted_upload_is_marked_and_released(self):
+        calls, _ = self.call('POST', '/api/files/', [(b'content-length', b'2048')])
+        self.assertTrue(calls[0]['files.admitted'])
+        self.assertEqual(get_limiter('uploads').stats(), {
+            'in_flight': 0, 'in_flight_bytes': 0, 'waiting': 0, 'rejected': 0,
+        })
@@ -0,0 +1,92 @@
+import hashlib
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from files.cache import FileCache, file_cache
+from files.models import File, StorageMetadata
+
+class FileCacheTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        file_cache.clear()
+        self.addCleanup(file_cache.clear)
+
+    def upload(self, name, content):
+        return self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, content, content_type="application/pdf")},
+            format='multipart'
+        )
+
+    def test_retrieve_served_from_cache(self):
+        """Test repeated retrieves skip the database"""
+        created = self.upload("a.pdf", b'cached content').data
+        first = self.client.get(f"/api/files/{created['id']}/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get(f"/api/files/{created['id']}/")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.client.get('/api/files/not-a-uuid/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_negative_hash_entries_and_lru_bound(self):
+        """Test absent hashes are cached and the LRU evicts the oldest entries"""
+        cache = FileCache(max_entries=2, ttl=60, negative_ttl=60)
+        with self.assertNumQueries(1):
+            self.assertIsNone(cache.get_by_hash('0' * 64))
+            self.assertIsNone(cache.get_by_hash('0' * 64))
+        cache.get_by_hash('1' * 64)
+        cache.get_by_hash('2' * 64)
+        stats = cache.stats()
+        self.assertEqual((stats['negative_hits'], stats['misses'], stats['evictions']), (1, 3, 1))
+        self.assertEqual(stats['local_entries'], 2)
+
+    def test_reference_count_change_invalidates(self):
+        """Test duplicate uploads refresh the cached reference count"""
+        created = self.upload("a.pdf", b'same content').data
+        self.assertEqual(file_cache.get_by_id(created['id']).reference_count, 1)
+        self.assertEqual(self.upload("b.pdf", b'same content').status_code, status.HTTP_200_OK)
+        self.assertEqual(file_cache.get_by_id(created['id']).reference_count, 2)
+
+        self.client.delete(f"/api/files/{created['id']}/")
+        self.assertEqual(self.client.get(f"/api/files/{created['id']}/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_entries_cached_before_commit_are_dropped(self):
+        """Test a row re-cached by a concurrent read during the write transaction is invalidated on commit"""
+        created = self.upload("a.pdf", b'same content').data
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                File.objects.filter(id=created['id']).update(reference_count=2)
+                file_cache.invalidate(created['id'])
+                # Another request reads the committed row meanwhile
+                file_cache._set_local(f"file:id:{created['id']}", {'reference_count': 1}, 60)
+        self.assertEqual(file_cache.get_by_id(created['id']).reference_count, 2)
+
+    def test_stale_entries_fall_back_to_database(self):
+        """Test entries made stale by another process do not break uploads"""
+        # Positive entry for a row deleted elsewhere: the upload stores the blob again
+        created = self.upload("a.pdf", b'content one').data
+        file_cache.get_by_hash(hashlib.sha256(b'content one').hexdigest())
+        File.objects.filter(id=created['id']).delete()
+        self.assertEqual(self.upload("a.pdf", b'content one').status_code, status.HTTP_201_CREATED)
+
+        # Negative entry for a hash stored elsewhere: the upload becomes a reference
+        content = b'content two'
+        self.assertIsNone(file_cache.get_by_hash(hashlib.sha256(content).hexdigest()))
+        stored = File.objects.create(
+            file=SimpleUploadedFile("b.pdf", content), original_filename="b.pdf",
+            file_type="application/pdf", size=len(content), hash=hashlib.sha256(content).hexdigest()
+        )
+        blobs = set(default_storage.listdir('uploads')[1])
+        response = self.upload("b.pdf", content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(File.objects.get(original_filename="b.pdf").reference_count, 2)
+        # The losing upload's blob is not left behind
+        self.assertEqual(set(default_storage.listdir('uploads')[1]), blobs)
+        stored.file.delete(save=False)
+
+    def test_cache_stats_endpoint(self):
+        response = self.client.get('/api/files/cache-stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+from django.db import DatabaseError
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from files.models import FileChange, StorageMetadata
+
+class FileChangeFeedTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def upload(self, name, content):
+        return self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, content, content_type="application/pdf")},
+            format='multipart'
+        ).data
+
+    def test_events_recorded_for_create_reference_delete(self):
+        """Test create, duplicate upload and delete each append one event"""
+        created = self.upload("a.pdf", b'same content')
+        self.upload("b.pdf", b'same content')
+        self.client.delete(f"/api/files/{created['id']}/")
+
+        response = self.client.get('/api/changes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events = response.data['changes']
+        self.assertEqual([event['event'] for event in events], ['created', 'referenced', 'deleted'])
+        self.assertEqual([event['reference_count'] for event in events], [1, 2, 2])
+        self.assertTrue(all(event['file_id'] == created['id'] for event in events))
+        self.assertFalse(response.data['has_more'])
+
+    def test_since_cursor_batches(self):
+        """Test paging through the feed with a bounded batch size"""
+        for index in range(3):
+            self.upload(f"{index}.pdf", f'content {index}'.encode())
+
+        first = self.client.get('/api/changes/?limit=2').data
+        self.assertEqual(len(first['changes']), 2)
+        self.assertTrue(first['has_more'])
+        second = self.client.get(f"/api/changes/?since={first['cursor']}&limit=2").data
+        self.assertEqual(len(second['changes']), 1)
+        self.assertFalse(second['has_more'])
+        third = self.client.get(f"/api/changes/?since={second['cursor']}").data
+        self.assertEqual(third['changes'], [])
+        self.assertEqual(third['cursor'], second['cursor'])
+
+    def test_compaction(self):
+        """Test superseded events collapse and purged tombstones force a resync"""
+        created = self.upload("a.pdf", b'content')
+        self.upload("b.pdf", b'content')
+        self.client.delete(f"/api/files/{created['id']}/")
+
+        future = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(FileChange.compact(future), 2)
+        self.assertEqual(list(FileChange.objects.values_list('event', flat=True)), ['deleted'])
+
+        self.assertEqual(FileChange.purge_tombstones(future), 1)
+        response = self.client.get('/api/changes/?since=0')
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        response = self.client.get(f"/api/changes/?since={response.data['cursor']}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_purge_is_atomic(self):
+        """Test tombstones stay when raising the floor fails"""
+        created = self.upload("a.pdf", b'content')
+        self.client.delete(f"/api/files/{created['id']}/")
+        future = timezone.now() + timedelta(seconds=1)
+        with mock.patch.object(StorageMetadata, 'save', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                FileChange.purge_tombstones(future)
+        self.assertTrue(FileChange.objects.filter(event=FileChange.DELETED).exists())
+        self.assertEqual(StorageMetadata.get_instance().change_log_floor, 0)
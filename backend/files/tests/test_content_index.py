@@ -0,0 +1,83 @@
+from unittest import mock
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files import content_index
+from files.models import File, StorageMetadata
+
+def make_pdf(text):
+    """Minimal single-page PDF showing `text` in Helvetica"""
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream',
+    ]
+    body, offsets = b'%PDF-1.4\n', []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+    xref = len(body)
+    body += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    body += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    body += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return body
+
+class ContentIndexTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def upload(self, name, text):
+        response = self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, make_pdf(text), content_type="application/pdf")},
+            format='multipart'
+        )
+        return response.data
+
+    def test_upload_schedules_extraction_after_commit(self):
+        """Test new PDFs are queued for indexing and duplicates are not"""
+        with mock.patch.object(content_index, '_index_in_background') as index_in_background:
+            with self.captureOnCommitCallbacks(execute=True):
+                created = self.upload("a.pdf", "quarterly revenue report")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.upload("b.pdf", "quarterly revenue report")
+            content_index._executor.shutdown(wait=True)
+            content_index._executor = None
+        index_in_background.assert_called_once()
+        self.assertEqual(str(index_in_background.call_args.args[0]), created['id'])
+
+    def test_index_search_and_filter(self):
+        """Test ranked search, the content filter and removal on delete"""
+        revenue = self.upload("revenue.pdf", "quarterly revenue grew in every region")
+        self.upload("minutes.pdf", "meeting minutes about the office move")
+        self.assertEqual(content_index.index_pending(), 2)
+        self.assertEqual(content_index.index_pending(), 0)
+
+        response = self.client.get('/api/files/content-search/?q=revenue')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['id'] for result in response.data['results']], [revenue['id']])
+        self.assertIn('revenue', response.data['results'][0]['snippet'])
+        # limit is clamped to 1..100; non-integers are rejected
+        with mock.patch('files.content_index.search', return_value=[]) as search:
+            self.client.get('/api/files/content-search/?q=revenue&limit=-1')
+            self.client.get('/api/files/content-search/?q=revenue&limit=1000')
+        self.assertEqual([call.args[1] for call in search.call_args_list], [1, 100])
+        response = self.client.get('/api/files/content-search/?q=revenue&limit=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Porter stemming and prefix terms
+        response = self.client.get('/api/files/?content=meetings')
+        self.assertEqual([result['original_filename'] for result in response.data['results']], ['minutes.pdf'])
+        response = self.client.get('/api/files/?content=quarter*')
+        self.assertEqual(response.data['total'], 1)
+        # FTS5 syntax in user input is treated as plain text
+        response = self.client.get('/api/files/?content=NEAR(" OR')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.delete(f"/api/files/{revenue['id']}/")
+        self.assertTrue(content_index.is_indexed(File.objects.get().hash))
+        self.assertEqual(content_index.search('revenue', 10), [])
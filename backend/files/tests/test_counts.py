@@ -0,0 +1,64 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from files.counts import ESTIMATE, count_files
+from files.management.commands._bench import seed_files
+from files.models import File, FileFacet, StorageMetadata
+
+# Sample the whole (small) table so estimates are deterministic
+ESTIMATING = dict(settings.FILE_LIST_COUNT, estimate_above=0, sample_size=1000)
+
+class ListCountTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def upload(self, name):
+        return self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, name.encode(), content_type="application/pdf")},
+            format='multipart'
+        )
+
+    def test_cached_count_invalidated_on_writes(self):
+        """Test cached totals are reused across pages and refreshed after uploads and deletes"""
+        first = self.upload("a.pdf").data
+        self.upload("b.pdf")
+        response = self.client.get('/api/files/?count=cached&page_size=1')
+        self.assertEqual((response.data['total'], response.data['total_is_approximate']), (2, False))
+        # Page 2 reuses the count: only the change-id lookup and the page query run
+        with self.assertNumQueries(2):
+            self.client.get('/api/files/?count=cached&page_size=1&page=2')
+
+        self.upload("c.pdf")
+        self.assertEqual(self.client.get('/api/files/?count=cached').data['total'], 3)
+        self.client.delete(f"/api/files/{first['id']}/")
+        response = self.client.get('/api/files/?count=cached&mode=fast')
+        self.assertEqual(response.json()['total'], 2)
+        self.assertNotIn('X-Total-Count-Approximate', response)
+
+    @override_settings(FILE_LIST_COUNT=ESTIMATING)
+    def test_estimated_count_is_labelled(self):
+        """Test large results get a sampled estimate marked as approximate"""
+        seed_files(300)
+        FileFacet.rebuild()
+        response = self.client.get('/api/files/?count=estimate&file_type=application/pdf&page_size=10')
+        self.assertEqual(response.data['total'], 100)
+        self.assertEqual(response.data['pages'], 10)
+        self.assertTrue(response.data['total_is_approximate'])
+        fast = self.client.get('/api/files/?count=estimate&file_type=image/png&mode=ndjson')
+        self.assertEqual((fast['X-Total-Count'], fast['X-Total-Count-Approximate']), ('100', 'true'))
+
+        # Too few sampled matches to scale up: counted exactly instead
+        self.assertEqual(count_files(File.objects.filter(original_filename='document_7.pdf'), ESTIMATE), (1, False))
+
+    def test_default_and_invalid_strategy(self):
+        self.upload("a.pdf")
+        response = self.client.get('/api/files/')
+        self.assertEqual(response.data['total'], 1)
+        self.assertNotIn('total_is_approximate', response.data)
+        self.assertEqual(self.client.get('/api/files/?count=guess').status_code, status.HTTP_400_BAD_REQUEST)
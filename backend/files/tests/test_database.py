@@ -0,0 +1,102 @@
+import io
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from PIL import Image
+from rest_framework.test import APITestCase
+from django.db import connection, connections, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from django.utils import timezone
+from core.db.base import DatabaseWrapper, close_pool
+from files.management.commands._bench import seed_files
+from files.models import File, StorageMetadata
+from files.phash import dhash
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        # A file database; the test database is in memory, where WAL and pooling do not apply
+        self.wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': self.path}, 'file')
+        connections['file'] = self.wrapper
+        self.addCleanup(connections.__delitem__, 'file')
+        self.addCleanup(close_pool, self.path)
+        self.addCleanup(self.wrapper.close)
+
+    def test_pragmas_applied_on_connect(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_atomic_takes_write_lock_up_front(self):
+        """Test atomic blocks begin IMMEDIATE so other writers wait on the busy timeout"""
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='file'):
+            with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+    def test_closed_connections_are_reused(self):
+        """Test closing hands the sqlite3 connection to the per-process pool"""
+        self.wrapper.ensure_connection()
+        first = self.wrapper.connection
+        self.wrapper.close()
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, first)
+
+
+class UploadDateFilterTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def test_upload_date_is_an_index_range(self):
+        """Test the filter matches whole days and compares the bare column"""
+        seed_files(3000)  # one per minute going back from now, so about two days
+        today = timezone.localdate()
+        queryset = File.objects.filter(uploaded_at__date=today)
+        response = self.client.get(f'/api/files/?upload_date={today}')
+        self.assertEqual(response.data['total'], queryset.count())
+
+        from files.views import FileViewSet
+        filtered = FileViewSet().filter_files(File.objects.all(), {'upload_date': str(today - timedelta(days=1))})
+        self.assertEqual(filtered.count(), 1440)
+        self.assertNotIn('cast_date', str(filtered.query))
+        self.assertEqual(self.client.get('/api/files/?upload_date=yesterday').data['total'], 0)
+
+
+class UploadLockTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def test_upload_work_runs_before_the_write_lock(self):
+        """Test image decoding and the blob write happen outside atomic(), which takes the write lock"""
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def recorded(function):
+            def wrapper(*args, **kwargs):
+                depths.append(len(connection.atomic_blocks))
+                return function(*args, **kwargs)
+            return wrapper
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (16, 16), 'red').save(buffer, format='PNG')
+        storage = File._meta.get_field('file').storage
+        with mock.patch('files.views.dhash', recorded(dhash)), \
+                mock.patch.object(storage, 'save', recorded(storage.save)):
+            response = self.client.post(
+                '/api/files/',
+                {'file': SimpleUploadedFile("red.png", buffer.getvalue(), content_type="image/png")},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(depths, [depth, depth])
+        File.objects.get(id=response.data['id']).file.delete(save=False)
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files.events import Broadcaster, broadcaster, change_feed, sse_app
+from files.models import File, FileChange, StorageMetadata
+
+class BroadcasterTests(TestCase):
+    def test_fan_out_from_another_thread(self):
+        """Test one published message reaches every subscriber"""
+        hub = Broadcaster()
+
+        async def run():
+            first, second = hub.subscribe(10), hub.subscribe(10)
+            thread = threading.Thread(target=hub._dispatch, args=('deliver', b'message'))
+            thread.start()
+            thread.join()
+            return await first.next_message(1), await second.next_message(1)
+
+        self.assertEqual(async_to_sync(run)(), (b'message', b'message'))
+
+    def test_snapshots_coalesce_and_heartbeat(self):
+        """Test only the latest snapshot is sent and idle waits time out"""
+        hub = Broadcaster()
+
+        async def run():
+            subscription = hub.subscribe(10)
+            for snapshot in [b'one', b'two', b'three']:
+                subscription.deliver_snapshot(snapshot)
+            return await subscription.next_message(1), await subscription.next_message(0.01)
+
+        self.assertEqual(async_to_sync(run)(), (b'three', None))
+
+    def test_overflow_forces_resync(self):
+        """Test a subscriber whose queue fills up is cut off"""
+        hub = Broadcaster()
+
+        async def run():
+            subscription = hub.subscribe(1)
+            subscription.deliver(b'first')
+            subscription.deliver(b'second')
+            await subscription.next_message(1)
+
+        with self.assertRaises(OverflowError):
+            async_to_sync(run)()
+
+
+@override_settings(SSE_HEARTBEAT_SECONDS=0.2, SSE_POLL_SECONDS=0.05)
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def stream(self, write):
+        """Run the SSE app until the first heartbeat, calling `write` once it is subscribed"""
+        sent = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b': heartbeat'):
+                    disconnect.set()
+
+            async def change():
+                while broadcaster.subscriber_count() == 0:
+                    await asyncio.sleep(0)
+                # Let the initial snapshot and the feed's starting point go first so event order is predictable
+                await asyncio.sleep(0.1)
+                await sync_to_async(write)()
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/events/', 'headers': []}
+            await asyncio.gather(sse_app(scope, receive, send), change())
+
+        async_to_sync(run)()
+        # The feed thread exits once nobody is subscribed
+        if thread := change_feed._thread:
+            change_feed.wake()
+            thread.join(1)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(broadcaster.subscriber_count(), 0)
+        return [message['body'] for message in sent[1:]]
+
+    def test_stream_receives_upload_events(self):
+        """Test the SSE app streams the snapshot, file event and heartbeat"""
+        bodies = self.stream(self.upload)
+        self.assertTrue(bodies[0].startswith(b'event: storage\n'))
+        self.assertTrue(bodies[1].startswith(b'event: file.created\nid: '))
+        self.assertTrue(bodies[2].startswith(b'event: storage\n'))
+        self.assertIn(b'"total_files_referenced":1', bodies[2])
+        self.assertEqual(bodies[3], b': heartbeat\n\n')
+
+    def test_stream_follows_other_workers(self):
+        """Test changes committed without a local notification are picked up by polling"""
+        def other_worker():
+            FileChange.record(FileChange.CREATED, File(
+                hash='a' * 64, original_filename='other.pdf', file_type='application/pdf', size=1, reference_count=1
+            ))
+
+        bodies = self.stream(other_worker)
+        self.assertTrue(bodies[1].startswith(b'event: file.created\nid: '))
+        self.assertIn(b'"original_filename":"other.pdf"', bodies[1])
+        self.assertTrue(bodies[2].startswith(b'event: storage\n'))
+
+    def upload(self):
+        self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile("a.pdf", b'content', content_type="application/pdf")}
+        )
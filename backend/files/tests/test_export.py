@@ -0,0 +1,138 @@
+import asyncio
+import io
+import json
+import zipfile
+from unittest import mock
+from asgiref.sync import async_to_sync
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase
+from core.asgi import application
+from files import encoders, export
+from files.models import StorageMetadata
+from files.export import unique_archive_name
+
+class FileExportTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+
+    def upload(self, name, content, content_type="application/pdf"):
+        response = self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, content, content_type=content_type)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def read_archive(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_export_filtered_selection(self):
+        """Test exporting files using the list filters"""
+        self.upload("report.pdf", b'report content')
+        self.upload("photo.png", b'png content', content_type="image/png")
+
+        archive = self.read_archive(self.client.get('/api/files/export/?file_type=image/png'))
+        self.assertEqual(archive.namelist(), ['photo.png'])
+        self.assertEqual(archive.read('photo.png'), b'png content')
+        self.assertEqual(archive.getinfo('photo.png').compress_type, zipfile.ZIP_STORED)
+        self.assertIsNone(archive.testzip())
+
+    def test_export_by_ids_with_duplicate_names(self):
+        """Test exporting selected ids with clashing filenames"""
+        first = self.upload("same.pdf", b'first content')
+        second = self.upload("same.pdf", b'second content')
+        self.upload("other.pdf", b'other content')
+
+        response = self.client.get(f"/api/files/export/?ids={first['id']},{second['id']}")
+        archive = self.read_archive(response)
+        self.assertEqual(sorted(archive.namelist()), ['same (1).pdf', 'same.pdf'])
+        contents = {archive.read(name) for name in archive.namelist()}
+        self.assertEqual(contents, {b'first content', b'second content'})
+
+    def test_export_invalid_or_empty_selection(self):
+        """Test export error responses"""
+        response = self.client.get('/api/files/export/?ids=not-a-uuid')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/files/export/?search=missing')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unique_archive_name(self):
+        """Test deterministic renaming of duplicate entries"""
+        seen = set()
+        self.assertEqual(unique_archive_name("a.pdf", seen), "a.pdf")
+        self.assertEqual(unique_archive_name("A.pdf", seen), "A (1).pdf")
+        self.assertEqual(unique_archive_name("a.pdf", seen), "a (2).pdf")
+
+
+class AsgiStreamingTests(TransactionTestCase):
+    """Drive the streaming endpoints through the production ASGI application"""
+
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        for index in range(3):
+            response = self.client.post(
+                '/api/files/',
+                {'file': SimpleUploadedFile(f"file{index}.pdf", bytes([index]) * 1000, content_type="application/pdf")}
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get(self, path, query=b''):
+        """Return the response body and the order chunks were produced and sent in"""
+        messages, timeline = [], []
+
+        async def run():
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()
+
+            async def send(message):
+                messages.append(message)
+                if message.get('body'):
+                    timeline.append('sent')
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query,
+                'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+            }
+            await application(scope, receive, send)
+
+        def tracked(produce):
+            def wrapper(*args):
+                for chunk in produce(*args):
+                    timeline.append('produced')
+                    yield chunk
+            return wrapper
+
+        with mock.patch('files.views.stream_zip', tracked(export.stream_zip)), \
+                mock.patch('files.views.iter_ndjson', tracked(encoders.iter_ndjson)):
+            async_to_sync(run)()
+        self.assertEqual(messages[0]['status'], status.HTTP_200_OK)
+        return b''.join(message.get('body', b'') for message in messages[1:]), timeline
+
+    def assertStreamed(self, timeline):
+        # Buffering would produce every chunk before the first one is sent
+        self.assertLess(timeline.index('sent'), len(timeline) - 1 - timeline[::-1].index('produced'))
+
+    def test_export_streams(self):
+        body, timeline = self.get('/api/files/export/')
+        archive = zipfile.ZipFile(io.BytesIO(body))
+        self.assertEqual(sorted(archive.namelist()), ['file0.pdf', 'file1.pdf', 'file2.pdf'])
+        self.assertIsNone(archive.testzip())
+        self.assertStreamed(timeline)
+
+    def test_ndjson_streams(self):
+        body, timeline = self.get('/api/files/', b'mode=ndjson')
+        self.assertEqual(sorted(json.loads(line)['original_filename'] for line in body.splitlines()),
+                         ['file0.pdf', 'file1.pdf', 'file2.pdf'])
+        self.assertStreamed(timeline)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from files.models import File, FileFacet, StorageMetadata
+
+class FacetTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        self.ids = {}
+        for name, size, content_type in [
+            ("a.pdf", 100, "application/pdf"),
+            ("b.pdf", 3000, "application/pdf"),
+            ("c.png", 3500, "image/png"),
+        ]:
+            response = self.client.post(
+                '/api/files/',
+                {'file': SimpleUploadedFile(name, name.encode() * (size // len(name)), content_type=content_type)},
+                format='multipart'
+            )
+            self.ids[name] = response.data['id']
+
+    def test_rollups_match_queries(self):
+        """Test the unfiltered rollup view equals the GROUP BY computation"""
+        from files.facets import query_facets
+        rollup = self.client.get('/api/files/facets/').data
+        self.assertEqual(rollup['source'], 'rollup')
+        computed = query_facets(File.objects.all())
+        for facet in ['file_types', 'size_buckets', 'upload_days']:
+            self.assertEqual(rollup[facet], computed[facet])
+
+        self.assertEqual(rollup['file_types'][0], {'file_type': 'application/pdf', 'count': 2, 'bytes': 3100})
+        self.assertEqual(
+            [(bucket['min_size'], bucket['max_size'], bucket['count']) for bucket in rollup['size_buckets']],
+            [(64, 127, 1), (2048, 4095, 2)]
+        )
+        self.assertEqual(rollup['upload_days'], [
+            {'date': timezone.localdate().isoformat(), 'count': 3, 'bytes': 6600}
+        ])
+
+    def test_destroy_updates_rollups(self):
+        """Test deleting a file decrements its facet rows"""
+        self.client.delete(f"/api/files/{self.ids['c.png']}/")
+        rollup = self.client.get('/api/files/facets/').data
+        self.assertEqual([entry['file_type'] for entry in rollup['file_types']], ['application/pdf'])
+        self.assertEqual(FileFacet.objects.get(dimension='file_type', value='image/png').count, 0)
+
+        FileFacet.rebuild()
+        self.assertEqual(self.client.get('/api/files/facets/').data, rollup)
+
+    def test_filtered_facets(self):
+        """Test filters switch to GROUP BY queries over the matching rows"""
+        response = self.client.get('/api/files/facets/?min_size=1000')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'query')
+        self.assertEqual(
+            {entry['file_type']: entry['count'] for entry in response.data['file_types']},
+            {'application/pdf': 1, 'image/png': 1}
+        )
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        response = self.client.get(f'/api/files/facets/?upload_date={yesterday}')
+        self.assertEqual(response.data['file_types'], [])
@@ -0,0 +1,44 @@
+import json
+from unittest import mock
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files import encoders
+from files.models import StorageMetadata
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        for index, name in enumerate(["résumé.pdf", "line\u2028break.pdf", "scan.png"]):
+            response = self.client.post(
+                '/api/files/',
+                {'file': SimpleUploadedFile(name, f'content {index}'.encode(), content_type="application/pdf")},
+                format='multipart'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_fast_mode_matches_serializer_bytes(self):
+        """Test fast list output is byte-identical to the default list"""
+        for query in ['?page_size=2', '?page_size=2&page=2', '?search=scan', '?page_size=10']:
+            expected = self.client.get(f'/api/files/{query}')
+            fast = self.client.get(f'/api/files/{query}&mode=fast')
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast['Content-Type'], 'application/json')
+            self.assertEqual(fast.content, expected.content)
+
+    def test_fast_mode_without_orjson(self):
+        """Test the stdlib JSON fallback renders the same bytes"""
+        expected = self.client.get('/api/files/?page_size=10')
+        with mock.patch.object(encoders, 'orjson', None):
+            fast = self.client.get('/api/files/?page_size=10&mode=fast')
+        self.assertEqual(fast.content, expected.content)
+
+    def test_ndjson_stream(self):
+        """Test streaming a page as NDJSON"""
+        expected = self.client.get('/api/files/?page_size=10').json()
+        response = self.client.get('/api/files/?page_size=10&mode=ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['X-Total-Count'], '3')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected['results'])
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from files.history import downsample
+from files.models import StorageHistory, StorageMetadata
+
+class StorageHistoryTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        self.uploaded = {}
+        for name, content in [("a.pdf", b'x' * 1000), ("b.pdf", b'x' * 1000), ("c.pdf", b'y' * 10)]:
+            response = self.client.post(
+                '/api/files/',
+                {'file': SimpleUploadedFile(name, content, content_type="application/pdf")},
+                format='multipart'
+            )
+            self.uploaded[name] = response.data['id']
+        self.client.delete(f"/api/files/{self.uploaded['c.pdf']}/")
+        self.expected = {
+            'files_referenced': 3, 'unique_files_stored': 1, 'duplicates_prevented': 1, 'storage_saved_bytes': 1000,
+        }
+
+    def history(self, resolution, start=None, end=None):
+        params = {'resolution': resolution}
+        if start:
+            params.update(start=start.isoformat(), end=end.isoformat())
+        return self.client.get('/api/storage-metadata/history/', params)
+
+    def summed(self, buckets):
+        return {field: sum(bucket[field] for bucket in buckets) for field in StorageHistory.VALUE_FIELDS}
+
+    def test_deltas_recorded_per_minute(self):
+        """Test uploads, duplicates and deletes add to the current minute"""
+        response = self.history(StorageHistory.MINUTE)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(len(response.data['buckets']), (60, 61))  # every minute overlapping the last hour
+        self.assertEqual(self.summed(response.data['buckets']), self.expected)
+        self.assertLessEqual(StorageHistory.objects.count(), 2)  # one row per minute touched
+
+    def test_downsampling_keeps_totals(self):
+        """Test rolled up ranges report the same totals and expired minutes are purged"""
+        now = timezone.now()
+        start, end = now - timedelta(days=3), now + timedelta(days=3)
+        downsample(now + timedelta(hours=2), minute_retention=timedelta(hours=48), hour_retention=timedelta(days=90))
+        self.assertEqual(StorageHistory.objects.filter(resolution=StorageHistory.HOUR).count(), 1)
+        for resolution in (StorageHistory.HOUR, StorageHistory.DAY):
+            self.assertEqual(self.summed(self.history(resolution, start, end).data['buckets']), self.expected)
+
+        # Rerunning is harmless; once days are rolled up, hours and minutes can expire
+        later = now + timedelta(days=3)
+        downsample(later, minute_retention=timedelta(hours=1), hour_retention=timedelta(hours=1))
+        downsample(later, minute_retention=timedelta(hours=1), hour_retention=timedelta(hours=1))
+        self.assertEqual(list(StorageHistory.objects.values_list('resolution', flat=True)), [StorageHistory.DAY])
+        buckets = self.history(StorageHistory.DAY, start, end).data['buckets']
+        self.assertEqual(len(buckets), 7)
+        self.assertEqual(self.summed(buckets), self.expected)
+        self.assertEqual(self.summed(self.history(StorageHistory.HOUR, start, end).data['buckets'])['files_referenced'], 0)
+
+    def test_invalid_ranges(self):
+        now = timezone.now()
+        self.assertEqual(self.history('week').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(StorageHistory.HOUR, now, now).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.history(StorageHistory.MINUTE, now - timedelta(days=30), now).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        response = self.client.get('/api/storage-metadata/history/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,125 @@
+import io
+import time
+import numpy as np
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files.models import File, StorageMetadata
+from files.phash import dhash, hamming, near_duplicate_pairs, perceptual_index, reclaimable_report
+
+def make_image(seed, size=(64, 48), image_format='PNG'):
+    """Smooth random gradient image, encoded in `image_format`"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(6, 8), dtype=np.uint8)
+    image = Image.fromarray(coarse, 'L').resize(size, Image.BILINEAR).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=70)
+    return buffer.getvalue()
+
+def distance(a, b):
+    return int(hamming(np.array([a], dtype=np.int64).view(np.uint64), b)[0])
+
+class PerceptualHashTests(APITestCase):
+    def setUp(self):
+        StorageMetadata.objects.create(id=1)
+        perceptual_index.invalidate()
+
+    def upload(self, name, content, content_type):
+        response = self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile(name, content, content_type=content_type)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_dhash_survives_reencoding_and_resizing(self):
+        """Test a resized JPEG copy hashes close to the PNG original"""
+        original = dhash(io.BytesIO(make_image(1)))
+        copy = dhash(io.BytesIO(make_image(1, size=(128, 96), image_format='JPEG')))
+        other = dhash(io.BytesIO(make_image(2)))
+        self.assertLessEqual(distance(original, copy), 4)
+        self.assertGreater(distance(original, other), 10)
+        self.assertIsNone(dhash(io.BytesIO(b'not an image')))
+
+    def test_near_duplicate_pairs_match_brute_force(self):
+        """Test multi-index pair search finds exactly the brute force pairs"""
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(0, 2 ** 64, size=300, dtype=np.uint64)
+        hashes[150:] = hashes[:150] ^ (np.uint64(1) << rng.integers(0, 64, size=150, dtype=np.uint64))
+        left, right, _ = near_duplicate_pairs(hashes, 3)
+        expected = {
+            (i, j) for i in range(len(hashes)) for j in range(i + 1, len(hashes))
+            if bin(int(hashes[i] ^ hashes[j])).count('1') <= 3
+        }
+        self.assertEqual(set(zip(left.tolist(), right.tolist())), expected)
+
+    def test_report_collapses_identical_hashes(self):
+        """Test thousands of copies of one image cluster without pairing every copy"""
+        rng = np.random.default_rng(0)
+        hashes = rng.integers(0, 2 ** 64, size=3000, dtype=np.uint64)
+        hashes[:2000] = hashes[0]
+        hashes[2000] = hashes[0] ^ np.uint64(0b101)  # a near copy joins the same cluster
+        hashes[2001:2003] = hashes[2003] ^ np.uint64(1 << 40)  # plus a separate cluster of three
+        sizes = [1] * len(hashes)
+        sizes[2000] = 5
+        started = time.perf_counter()
+        report = reclaimable_report(list(range(len(hashes))), hashes, sizes, 4)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual([(cluster['keep'], len(cluster['duplicates'])) for cluster in report['clusters']],
+                         [(2000, 2000), (2001, 2)])
+        self.assertEqual(report['reclaimable_bytes'], 2002)
+
+    def test_similar_and_report_endpoints(self):
+        """Test ingest hashing, similar lookup and the reclaimable bytes report"""
+        original = self.upload("photo.png", make_image(1), "image/png")
+        copy = self.upload("photo.jpg", make_image(1, size=(128, 96), image_format='JPEG'), "image/jpeg")
+        self.upload("other.png", make_image(2), "image/png")
+        document = self.upload("doc.pdf", b'pdf content', "application/pdf")
+        self.assertIsNone(File.objects.get(id=document['id']).phash)
+
+        response = self.client.get(f"/api/files/{original['id']}/similar/?threshold=4")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['id'] for result in response.data['results']], [copy['id']])
+
+        response = self.client.get('/api/files/near-duplicates/')
+        self.assertEqual(len(response.data['clusters']), 1)
+        cluster = response.data['clusters'][0]
+        smaller = min([original, copy], key=lambda data: data['size'])
+        self.assertEqual([str(file_id) for file_id in cluster['duplicates']], [smaller['id']])
+        self.assertEqual(response.data['reclaimable_bytes'], smaller['size'])
+
+        # Deleting the copy is picked up from the change feed
+        self.client.delete(f"/api/files/{copy['id']}/")
+        response = self.client.get('/api/files/near-duplicates/')
+        self.assertEqual(response.data['clusters'], [])
+
+        response = self.client.get(f"/api/files/{document['id']}/similar/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/files/near-duplicates/?threshold=64')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backfill_reaches_loaded_indexes(self):
+        """Test a phash backfill makes already loaded indexes reload"""
+        image = self.upload("photo.png", make_image(1), "image/png")
+        File.objects.update(phash=None)
+        perceptual_index.invalidate()
+        self.assertEqual(len(perceptual_index.refresh().ids), 0)
+
+        # The command only touches shared state, like a run from another process
+        call_command('compute_phashes', stdout=io.StringIO())
+        self.assertEqual([str(file_id) for file_id in perceptual_index.refresh().ids], [image['id']])
+
+    def test_refresh_swaps_immutable_snapshots(self):
+        """Test a snapshot handed to a lookup is never changed by later refreshes"""
+        first = self.upload("one.png", make_image(1), "image/png")
+        before = perceptual_index.refresh()
+        self.upload("two.png", make_image(2), "image/png")
+        after = perceptual_index.refresh()
+        self.assertIsNot(before, after)
+        self.assertEqual([str(file_id) for file_id in before.ids], [first['id']])
+        self.assertEqual((len(after.ids), len(after.sizes), len(after.hashes)), (2, 2, 2))
+        with self.assertRaises(ValueError):
+            before.hashes[0] = 0
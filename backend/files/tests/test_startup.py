@@ -0,0 +1,44 @@
+import os
+from io import StringIO
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from files.management.commands import migrate_if_needed
+from files.management.commands._bench import seed_files
+from files.models import File, StorageMetadata
+from files.phash import perceptual_index
+from files.warmup import warm_caches
+
+class MigrateIfNeededTests(TestCase):
+    def test_migrate_skipped_while_fingerprint_matches(self):
+        """Test migrate only runs when no matching fingerprint was saved"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'migrations.fingerprint')
+        with mock.patch.object(migrate_if_needed, 'call_command') as migrate:
+            for _ in range(3):
+                call_command('migrate_if_needed', fingerprint_file=path, stdout=StringIO())
+            self.assertEqual(migrate.call_count, 1)
+
+            with open(path, 'w') as stale:
+                stale.write('stale')
+            call_command('migrate_if_needed', fingerprint_file=path, stdout=StringIO())
+            self.assertEqual(migrate.call_count, 2)
+
+        with open(path) as saved:
+            self.assertEqual(saved.read(), migrate_if_needed.migration_fingerprint())
+
+
+class WarmupTests(TestCase):
+    def test_warm_caches(self):
+        seed_files(50)
+        perceptual_index.invalidate()
+        warm_caches()
+        self.assertTrue(StorageMetadata.objects.filter(id=1).exists())
+        self.assertIsNotNone(perceptual_index._cursor)
+        # Planner statistics were collected for the file table
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM sqlite_stat1 WHERE tbl = %s', [File._meta.db_table])
+            self.assertGreater(cursor.fetchone()[0], 0)
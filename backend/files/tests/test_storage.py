@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+from urllib.parse import urlparse
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from files.models import File, StorageMetadata
+from files.storage import HashRing, VolumeStorage, parse_volumes
+
+class VolumeStorageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def volumes(self, **weights):
+        return [
+            {'name': name, 'path': os.path.join(self.root, name), 'weight': weight}
+            for name, weight in weights.items()
+        ]
+
+    def blob_names(self, count):
+        return [f'uploads/{hashlib.sha256(str(index).encode()).hexdigest()}.pdf' for index in range(count)]
+
+    def test_parse_volumes(self):
+        """Test the STORAGE_VOLUMES env format"""
+        self.assertEqual(parse_volumes('a=/mnt/a:2, b=/mnt/b'), [
+            {'name': 'a', 'path': '/mnt/a', 'weight': 2},
+            {'name': 'b', 'path': '/mnt/b', 'weight': 1},
+        ])
+
+    def test_weighted_placement_and_minimal_movement(self):
+        """Test weights skew placement and adding a volume only moves its share"""
+        names = self.blob_names(3000)
+        before = VolumeStorage(self.volumes(a=1, b=3))
+        owners = [before.owner(name) for name in names]
+        self.assertGreater(owners.count('b'), 2 * owners.count('a'))
+
+        after = VolumeStorage(self.volumes(a=1, b=3, c=2))
+        changed = [name for name, owner in zip(names, owners) if after.owner(name) != owner]
+        self.assertTrue(all(after.owner(name) == 'c' for name in changed))
+        self.assertLess(len(changed), len(names) * 0.45)
+
+    def test_save_read_delete_across_volumes(self):
+        """Test blobs land on their owner and stay readable through the storage"""
+        storage = VolumeStorage(self.volumes(a=1, b=1))
+        for name in self.blob_names(20):
+            saved = storage.save(name, ContentFile(name.encode()))
+            self.assertEqual(saved, name)
+            self.assertEqual(storage.locate(name)[0], storage.owner(name))
+            with storage.open(name) as handle:
+                self.assertEqual(handle.read(), name.encode())
+        storage.delete(name)
+        self.assertFalse(storage.exists(name))
+
+    def test_rebalance_after_adding_and_draining(self):
+        """Test rebalancing moves only misplaced blobs and keeps them readable"""
+        names = self.blob_names(200)
+        storage = VolumeStorage(self.volumes(a=1))
+        for name in names:
+            storage.save(name, ContentFile(name.encode()))
+
+        grown = VolumeStorage(self.volumes(a=1, b=1))
+        misplaced = sum(grown.owner(name) == 'b' for name in names)
+        # Before rebalancing, blobs are still found on the old volume
+        self.assertTrue(all(grown.exists(name) for name in names))
+        self.assertEqual(grown.rebalance(dry_run=True)[0], misplaced)
+        self.assertEqual(grown.rebalance()[0], misplaced)
+        self.assertEqual(grown.rebalance()[0], 0)
+
+        # Weight 0 drains volume a completely
+        drained = VolumeStorage(self.volumes(a=0, b=1))
+        drained.rebalance()
+        self.assertEqual([volume for volume, _ in drained.iter_blobs()], ['b'] * len(names))
+        for name in names:
+            with drained.open(name) as handle:
+                self.assertEqual(handle.read(), name.encode())
+
+    def test_rebalance_skips_blobs_deleted_meanwhile(self):
+        """Test a blob deleted while being moved leaves no copy behind and the run continues"""
+        names = self.blob_names(50)
+        storage = VolumeStorage(self.volumes(a=1))
+        for name in names:
+            storage.save(name, ContentFile(name.encode()))
+        grown = VolumeStorage(self.volumes(a=1, b=1))
+        misplaced = [name for name in names if grown.owner(name) == 'b']
+        copy = shutil.copyfileobj
+
+        def copy_then_delete(reader, writer):
+            copy(reader, writer)
+            if reader.name.endswith(misplaced[0]):
+                grown.delete(misplaced[0])  # a concurrent destroy
+
+        with mock.patch('files.storage.shutil.copyfileobj', copy_then_delete):
+            self.assertEqual(grown.rebalance()[0], len(misplaced) - 1)
+        self.assertFalse(grown.exists(misplaced[0]))
+        self.assertEqual(sorted(name for _, name in grown.iter_blobs()), sorted(set(names) - {misplaced[0]}))
+        self.assertFalse([name for name in os.listdir(os.path.join(self.root, 'b', 'uploads')) if 'rebalance' in name])
+
+    @override_settings(DEBUG=True)
+    def test_uploads_named_opaquely_and_served(self):
+        """Test uploads keep random names (not their SHA-256) and are served through the storage"""
+        StorageMetadata.objects.create(id=1)
+        content = b'served through storage'
+        response = self.client.post(
+            '/api/files/',
+            {'file': SimpleUploadedFile("served.pdf", content, content_type="application/pdf")},
+            format='multipart'
+        )
+        instance = File.objects.get(id=response.data['id'])
+        self.addCleanup(instance.file.delete, save=False)
+        self.assertRegex(instance.file.name, r'^uploads/[0-9a-f-]{36}\.pdf$')
+        self.assertNotIn(hashlib.sha256(content).hexdigest(), response.data['file'])
+
+        served = self.client.get(urlparse(response.data['file']).path)
+        self.assertEqual(served.status_code, 200)
+        self.assertEqual(b''.join(served.streaming_content), content)
+        self.assertEqual(self.client.get('/media/uploads/missing.pdf').status_code, 404)
+
+    def test_ring_needs_a_weighted_volume(self):
+        with self.assertRaises(ValueError):
+            HashRing([{'name': 'a', 'weight': 0}])
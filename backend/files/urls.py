@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FileViewSet, StorageMetadataViewSet
+from .views import FileChangeViewSet, FileViewSet, StorageMetadataViewSet
 
 router = DefaultRouter()
 router.register(r'files', FileViewSet)
 router.register(r'storage-metadata', StorageMetadataViewSet)
+router.register(r'changes', FileChangeViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,16 +1,48 @@
 import hashlib
+import os
+import uuid
+from datetime import datetime, time, timedelta
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.utils.dateparse import parse_date
-from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.core.paginator import Paginator
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
 from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import File, StorageMetadata
-from .serializers import FileSerializer, StorageMetadataSerializer
+from . import content_index
+from .cache import file_cache
+from .counts import EXACT, STRATEGIES, count_files
+from .encoders import FILE_LIST_FIELDS, iter_ndjson, make_file_row_encoder, render_json
+from .events import notify_on_commit
+from .export import stream_zip
+from .facets import query_facets, rollup_facets
+from .history import storage_history
+from .models import File, FileChange, FileFacet, StorageHistory, StorageMetadata
+from .phash import (
+    DEFAULT_THRESHOLD, IMAGE_CONTENT_TYPES, MAX_THRESHOLD, REPORT_DEFAULT_THRESHOLD,
+    REPORT_MAX_THRESHOLD, dhash, perceptual_index,
+)
+from .serializers import FileChangeSerializer, FileSerializer, StorageMetadataSerializer
+from .streaming import streaming_response
 
 
 # Create your views here.
 
+def serve_media(request, path):
+    """Serve an uploaded blob from whichever storage volume holds it (development only)"""
+    if not settings.DEBUG:
+        raise Http404(path)
+    try:
+        return FileResponse(default_storage.open(path), filename=os.path.basename(path))
+    except FileNotFoundError:
+        raise Http404(path)
+
+
 class FileViewSet(viewsets.ModelViewSet):
     queryset = File.objects.all()
     serializer_class = FileSerializer
@@ -26,58 +58,76 @@ class FileViewSet(viewsets.ModelViewSet):
                 {'error': f'File size cannot exceed 10 MB'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        # Hashing, image decoding and the blob write happen before any
+        # transaction: atomic() takes SQLite's database-wide write lock at BEGIN
+        digest = hashlib.sha256()
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+        file_obj.seek(0)  # Reset file pointer after reading
+        file_hash = digest.hexdigest()
+        # Perceptual hash for near-duplicate search; None for non-images or undecodable files
+        phash = dhash(file_obj) if file_obj.content_type in IMAGE_CONTENT_TYPES else None
         try:
             with transaction.atomic():
-                file_hash = hashlib.sha256(file_obj.read()).hexdigest()
-                file_obj.seek(0)  # Reset file pointer after reading
-                existing_file = File.objects.filter(hash=file_hash).first()
-                metadata = StorageMetadata.get_instance()
-                if existing_file:
-                    # Update reference count and metadata for duplicate file
-                    existing_file.reference_count += 1
-                    existing_file.save()
-                    # Update metadata
-                    metadata.total_files_referenced += 1
-                    metadata.duplicates_prevented += 1
-                    metadata.storage_saved_mb += existing_file.size / (1024 * 1024)
-                    metadata.save()
-                    return Response(FileSerializer(existing_file).data, status=status.HTTP_200_OK)
-                # Create new file
-                data = {
-                    'file': file_obj,
-                    'original_filename': file_obj.name,
-                    'file_type': file_obj.content_type,
-                    'size': file_obj.size,
-                    'hash': file_hash,
-                    'reference_count': 1
-                }
-                serializer = self.get_serializer(data=data)
-                try:
-                    serializer.is_valid(raise_exception=True)
-                except ValidationError as e:
-                    return Response(
-                        {'error': e.message_dict}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                except Exception as e:
-                        return Response(
-                            {'error': str(e)}, 
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                try:
-                    self.perform_create(serializer)
-                except ValidationError as e:
+                existing_file = file_cache.get_by_hash(file_hash)
+                if existing_file and (response := self.add_reference(existing_file, StorageMetadata.get_instance())):
+                    return response
+            # Create new file
+            data = {
+                'file': file_obj,
+                'original_filename': file_obj.name,
+                'file_type': file_obj.content_type,
+                'size': file_obj.size,
+            }
+            serializer = self.get_serializer(data=data)
+            try:
+                serializer.is_valid(raise_exception=True)
+            except ValidationError as e:
+                return Response(
+                    {'error': e.message_dict}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except Exception as e:
                     return Response(
-                        {'error': e.message_dict}, 
+                        {'error': str(e)}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                # Update metadata for new file
-                metadata.total_files_referenced += 1
-                metadata.unique_files_stored += 1
-                metadata.save()
+            instance = File(**serializer.validated_data, hash=file_hash, phash=phash)
+            instance.clean()
+            instance.file.save(file_obj.name, file_obj, save=False)
+            stored = False
+            try:
+                with transaction.atomic():
+                    try:
+                        with transaction.atomic():
+                            instance.save()
+                    except IntegrityError:
+                        # Another process stored the same blob after our (possibly cached) lookup
+                        file_cache.invalidate(file_hash=file_hash)
+                        existing_file = File.objects.filter(hash=file_hash).first()
+                        if existing_file is None:
+                            raise
+                        return self.add_reference(existing_file, StorageMetadata.get_instance())
+                    file_cache.invalidate(file_hash=file_hash)  # Drop the negative entry
+                    # Update metadata for new file
+                    metadata = StorageMetadata.get_instance()
+                    metadata.total_files_referenced += 1
+                    metadata.unique_files_stored += 1
+                    metadata.save()
+                    StorageHistory.record(files_referenced=1, unique_files_stored=1)
+                    FileChange.record(FileChange.CREATED, instance)
+                    notify_on_commit()
+                    FileFacet.apply(instance, 1)
+                    content_index.schedule(instance)
+                    stored = True
+            finally:
+                if not stored:
+                    # The row was not inserted (lost the race or rolled back); drop its blob
+                    instance.file.delete(save=False)
 
-                headers = self.get_success_headers(serializer.data)
-                return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+            serializer.instance = instance
+            headers = self.get_success_headers(serializer.data)
+            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except ValidationError as e:
             return Response(
                 {'error': e.message_dict}, 
@@ -89,49 +139,250 @@ class FileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Apply filters conditionally
-        if search := request.query_params.get('search'):
+    def add_reference(self, existing_file, metadata):
+        """
+        Count another upload of an already stored blob. Returns None if the
+        row no longer exists (a stale cache entry) so the caller stores it anew.
+        """
+        # Update reference count atomically; the cached copy may be behind
+        updated = File.objects.filter(pk=existing_file.pk).update(reference_count=F('reference_count') + 1)
+        file_cache.invalidate(existing_file.id, existing_file.hash)
+        if not updated:
+            return None
+        existing_file.reference_count = File.objects.values_list('reference_count', flat=True).get(pk=existing_file.pk)
+        # Update metadata
+        metadata.total_files_referenced += 1
+        metadata.duplicates_prevented += 1
+        metadata.storage_saved_mb += existing_file.size / (1024 * 1024)
+        metadata.save()
+        StorageHistory.record(
+            files_referenced=1, duplicates_prevented=1, storage_saved_bytes=existing_file.size
+        )
+        FileChange.record(FileChange.REFERENCED, existing_file)
+        notify_on_commit()
+        return Response(FileSerializer(existing_file).data, status=status.HTTP_200_OK)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            file_id = uuid.UUID(str(kwargs[self.lookup_field]))
+        except ValueError:
+            raise Http404
+        instance = file_cache.get_by_id(file_id)
+        if instance is None:
+            raise Http404
+        return Response(self.get_serializer(instance).data)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Hit/miss counters of this process's file lookup cache"""
+        return Response(file_cache.stats())
+
+    # Query parameters understood by filter_files
+    FILTER_PARAMS = ('search', 'file_type', 'min_size', 'max_size', 'upload_date', 'content')
+
+    def filter_files(self, queryset, params):
+        """Apply the listing filters from the query string to `queryset`"""
+        if search := params.get('search'):
             queryset = queryset.filter(original_filename__icontains=search)
             
-        if file_type := request.query_params.get('file_type'):
+        if file_type := params.get('file_type'):
             queryset = queryset.filter(file_type=file_type)
             
-        if min_size := request.query_params.get('min_size'):
+        if min_size := params.get('min_size'):
             queryset = queryset.filter(size__gte=int(min_size))
             
-        if max_size := request.query_params.get('max_size'):
+        if max_size := params.get('max_size'):
             queryset = queryset.filter(size__lte=int(max_size))
             
-        if upload_date := request.query_params.get('upload_date'):
-            queryset = queryset.filter(uploaded_at__date=parse_date(upload_date))
+        if upload_date := params.get('upload_date'):
+            # A range on the bare column can use its index; __date wraps it in a function
+            day = parse_date(upload_date)
+            if day is None:
+                return queryset.none()
+            start, end = (timezone.make_aware(datetime.combine(date, time.min)) for date in (day, day + timedelta(days=1)))
+            queryset = queryset.filter(uploaded_at__gte=start, uploaded_at__lt=end)
+
+        if content := params.get('content'):
+            matching = content_index.matching_hashes(content)
+            queryset = queryset.filter(hash__in=matching) if matching is not None else queryset.none()
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.filter_files(queryset, request.query_params)
         
         # Add pagination
         page_size = int(request.query_params.get('page_size', 5))
         page = int(request.query_params.get('page', 1))
+        strategy = request.query_params.get('count', settings.FILE_LIST_COUNT['strategy'])
+        if strategy not in STRATEGIES:
+            return Response(
+                {'error': f'count must be one of: {", ".join(STRATEGIES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if (mode := request.query_params.get('mode')) in ('fast', 'ndjson'):
+            return self.fast_list(request, queryset, page, page_size, strategy, stream=mode == 'ndjson')
         
-        paginator = Paginator(queryset, page_size)
+        paginator, approximate = self.paginate_files(queryset, page_size, strategy)
         results = paginator.get_page(page)
 
         serializer = self.get_serializer(results, many=True)
         
-        return Response({
+        data = {
             'results': serializer.data,
             'total': paginator.count,
             'pages': paginator.num_pages,
             'current_page': page
-        })
-    
-        # page = self.paginate_queryset(queryset)
-        # if page is not None:
-        #     serializer = self.get_serializer(page, many=True)
-        #     return self.get_paginated_response(serializer.data)
-    
-        # serializer = self.get_serializer(queryset, many=True)
-        # return Response(serializer.data)
-    
+        }
+        if strategy != EXACT:
+            data['total_is_approximate'] = approximate
+        return Response(data)
+
+    def paginate_files(self, queryset, page_size, strategy):
+        """Paginator whose total comes from the `strategy` count; also returns whether it is approximate"""
+        paginator = Paginator(queryset, page_size)
+        if strategy != EXACT:
+            # Paginator.count is a cached_property, so this replaces its COUNT(*)
+            paginator.count, approximate = count_files(queryset, strategy)
+            return paginator, approximate
+        return paginator, False
+
+    def fast_list(self, request, queryset, page, page_size, strategy=EXACT, stream=False):
+        """
+        Listing that skips model instances and the DRF serializer.
+        Rows come from `values()` and are encoded by a precompiled row encoder;
+        the output is byte-compatible with the regular `list` response.
+        With `stream=True` the page is sent as NDJSON, one file per line,
+        and the pagination totals move to response headers.
+        """
+        paginator, approximate = self.paginate_files(queryset.values(*FILE_LIST_FIELDS), page_size, strategy)
+        results = paginator.get_page(page)
+        encode = make_file_row_encoder(request, File._meta.get_field('file').storage)
+
+        if stream:
+            response = streaming_response(
+                request,
+                iter_ndjson(results.object_list.iterator(), encode),
+                content_type='application/x-ndjson',
+            )
+        else:
+            data = {
+                'results': [encode(row) for row in results.object_list],
+                'total': paginator.count,
+                'pages': paginator.num_pages,
+                'current_page': page
+            }
+            if strategy != EXACT:
+                data['total_is_approximate'] = approximate
+            response = HttpResponse(render_json(data), content_type='application/json')
+        if approximate:
+            response['X-Total-Count-Approximate'] = 'true'
+        response['X-Total-Count'] = paginator.count
+        response['X-Total-Pages'] = paginator.num_pages
+        response['X-Current-Page'] = page
+        return response
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts and byte totals by file type, log2 size bucket and upload day
+        for the current filters. Unfiltered requests are served from rollups.
+        """
+        if not any(request.query_params.get(param) for param in self.FILTER_PARAMS):
+            return Response(rollup_facets())
+        queryset = self.filter_files(self.filter_queryset(self.get_queryset()), request.query_params)
+        return Response(query_facets(queryset))
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Stream a ZIP archive of the selected files.
+        Accepts either `ids` (comma separated) or the same filters as `list`.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if ids := request.query_params.get('ids'):
+            try:
+                id_list = [uuid.UUID(value) for value in ids.split(',') if value]
+            except ValueError:
+                return Response({'error': 'Invalid file id'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(id__in=id_list)
+        else:
+            queryset = self.filter_files(queryset, request.query_params)
+
+        # Stable ordering keeps duplicate-name suffixes deterministic
+        queryset = queryset.order_by('-uploaded_at', 'id')
+        if not queryset.exists():
+            return Response({'error': 'No files match the selection'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = streaming_response(
+            request,
+            stream_zip(queryset.iterator(chunk_size=500)),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = 'attachment; filename="files.zip"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='content-search')
+    def content_search(self, request):
+        """PDFs ranked by how well their text matches `q` (BM25), with a snippet"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        # SQLite treats a negative LIMIT as no limit
+        limit = min(max(limit, 1), 100)
+        hits = content_index.search(query, limit)
+        files = {instance.hash: instance for instance in File.objects.filter(hash__in=[hit[0] for hit in hits])}
+        results = []
+        for file_hash, score, snippet in hits:
+            if file_hash in files:
+                data = self.get_serializer(files[file_hash]).data
+                data['snippet'] = snippet
+                data['score'] = -score  # bm25() is lower-is-better
+                results.append(data)
+        return Response({'results': results})
+
+    def get_threshold(self, request, default, maximum):
+        threshold = int(request.query_params.get('threshold', default))
+        if not 0 <= threshold <= maximum:
+            raise ValueError(f'threshold must be between 0 and {maximum}')
+        return threshold
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Images whose perceptual hash is within `threshold` bits of this one"""
+        instance = self.get_object()
+        if instance.phash is None:
+            return Response({'error': 'File has no perceptual hash'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            threshold = self.get_threshold(request, DEFAULT_THRESHOLD, MAX_THRESHOLD)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = perceptual_index.refresh().similar(instance.phash, threshold, exclude=instance.id)
+        files = File.objects.in_bulk([file_id for file_id, _ in matches])
+        results = []
+        for file_id, distance in matches:
+            if file_id in files:
+                data = self.get_serializer(files[file_id]).data
+                data['distance'] = distance
+                results.append(data)
+        return Response({'results': results, 'threshold': threshold})
+
+    @action(detail=False, methods=['get'], url_path='near-duplicates')
+    def near_duplicates(self, request):
+        """Clusters of near-duplicate images and the bytes freed by keeping one of each"""
+        try:
+            threshold = self.get_threshold(request, REPORT_DEFAULT_THRESHOLD, REPORT_MAX_THRESHOLD)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        report = perceptual_index.refresh().report(threshold)
+        report['threshold'] = threshold
+        return Response(report)
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         
@@ -143,8 +394,14 @@ class FileViewSet(viewsets.ModelViewSet):
             
             metadata.unique_files_stored -= 1  # Decrease unique files since we're deleting the actual file
             metadata.save()
+            StorageHistory.record(unique_files_stored=-1)
             
             # Delete the database record
+            FileChange.record(FileChange.DELETED, instance)
+            notify_on_commit()
+            content_index.remove(instance.hash)
+            FileFacet.apply(instance, -1)
+            file_cache.invalidate(instance.id, instance.hash)
             instance.delete()
             
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -159,4 +416,94 @@ class StorageMetadataViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet)
 
     def get_object(self):
         """Always return the singleton instance"""
-        return StorageMetadata.get_instance()
\ No newline at end of file
+        return StorageMetadata.get_instance()
+
+    MAX_HISTORY_BUCKETS = 2000
+    # Window returned when `start` is omitted
+    DEFAULT_HISTORY_SPAN = {
+        StorageHistory.MINUTE: timedelta(hours=1),
+        StorageHistory.HOUR: timedelta(days=2),
+        StorageHistory.DAY: timedelta(days=90),
+    }
+
+    @staticmethod
+    def parse_time(value):
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(value)
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Changes to the storage totals per `resolution` (minute, hour or day)
+        bucket between `start` and `end` (ISO 8601; defaults to a recent window).
+        """
+        resolution = request.query_params.get('resolution', StorageHistory.HOUR)
+        if resolution not in StorageHistory.STEPS:
+            return Response(
+                {'error': f'resolution must be one of: {", ".join(StorageHistory.STEPS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            end = self.parse_time(request.query_params.get('end')) or timezone.now()
+            start = self.parse_time(request.query_params.get('start')) or end - self.DEFAULT_HISTORY_SPAN[resolution]
+        except ValueError:
+            return Response({'error': 'start and end must be ISO 8601 datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({'error': 'start must be before end'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start) / StorageHistory.STEPS[resolution] > self.MAX_HISTORY_BUCKETS:
+            return Response(
+                {'error': f'At most {self.MAX_HISTORY_BUCKETS} buckets per request; use a coarser resolution'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'resolution': resolution,
+            'start': start,
+            'end': end,
+            'buckets': storage_history(resolution, start, end),
+        })
+
+class FileChangeViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Change feed for incremental sync.
+    `GET /api/changes/?since=<cursor>` returns events after the cursor in id order,
+    at most `limit` per call; clients pass back the returned `cursor` until
+    `has_more` is false.
+    """
+    queryset = FileChange.objects.all()
+    serializer_class = FileChangeSerializer
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    def list(self, request, *args, **kwargs):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        floor = StorageMetadata.get_instance().change_log_floor
+        if since < floor:
+            # Deletes before the floor were compacted away; the client has to re-list
+            latest = FileChange.objects.order_by('-id').values_list('id', flat=True).first()
+            return Response(
+                {'error': 'Cursor is older than the change log; full resync required', 'cursor': latest or floor},
+                status=status.HTTP_410_GONE
+            )
+
+        # Fetch one extra row to know whether another batch follows
+        events = list(self.get_queryset().filter(id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+
+        return Response({
+            'changes': self.get_serializer(events, many=True).data,
+            'cursor': events[-1].id if events else since,
+            'has_more': has_more,
+        })
@@ -0,0 +1,37 @@
+from django.db import connections
+
+
+def warm_caches():
+    """
+    Build what each worker would otherwise build on its first requests: the
+    URLconf with everything it imports (views, DRF, numpy, Pillow, pypdf),
+    the storage counters row, the perceptual hash index and the unfiltered
+    listing count. Run it in the gunicorn master before workers fork so they
+    share these pages copy-on-write. Also collects SQLite's planner
+    statistics if the database has none yet.
+    """
+    from django.urls import get_resolver
+    from core.db.base import close_pool
+    from .counts import cached_count
+    from .models import File, StorageMetadata
+    from .phash import perceptual_index
+
+    get_resolver().url_patterns
+    StorageMetadata.get_instance()
+    perceptual_index.refresh()
+    cached_count(File.objects.all())
+    # Without planner statistics SQLite takes any equality index as selective
+    # and counts a whole file_type instead of the sampled key range (counts.py).
+    # Column selectivity barely moves as the table grows, so collect them once.
+    with connections['default'].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        analyzed = cursor.fetchone() is not None
+        if analyzed:
+            cursor.execute('SELECT 1 FROM sqlite_stat1 WHERE tbl = %s', [File._meta.db_table])
+            analyzed = cursor.fetchone() is not None
+        if not analyzed:
+            cursor.execute('ANALYZE')
+
+    # SQLite connections must not be carried across fork()
+    connections.close_all()
+    close_pool()
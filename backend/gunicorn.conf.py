@@ -0,0 +1,24 @@
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# Gunicorn also reads WEB_CONCURRENCY on its own; kept here for visibility
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# ASGI worker so /api/events/ (Server-Sent Events) can hold connections open.
+# Each worker follows the shared FileChange log, so streams see every worker's writes.
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Import Django, DRF and the app once in the master; workers fork with those
+# pages shared instead of each importing the whole stack again.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before any worker is forked"""
+    if preload_app:
+        from files.warmup import warm_caches
+        warm_caches()
+        # Move everything loaded so far out of the collector's reach: a GC pass
+        # in a worker would otherwise write to (and so copy) every shared page
+        gc.collect()
+        gc.freeze()
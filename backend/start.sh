@@ -4,11 +4,12 @@
 mkdir -p /app/data
 chmod -R 777 /app/data
 
-# Run migrations
-echo "Running migrations..."
-python manage.py makemigrations
-python manage.py migrate
+# Migrations are committed with the code; only apply them when the migration
+# files or the database changed since the last boot
+echo "Checking migrations..."
+python manage.py migrate_if_needed
 
 # Start server
 echo "Starting server..."
-gunicorn --bind 0.0.0.0:8000 core.wsgi:application 
\ No newline at end of file
+# Workers, preload and cache warm-up are configured in gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py core.asgi:application